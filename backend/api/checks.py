@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+FILE_BASED_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+
+
+@register()
+def metrics_cache_check(app_configs, **kwargs):
+    """Метрики в FileBasedCache теряют приращения при нескольких
+    воркерах."""
+    backend = settings.CACHES[settings.METRICS_CACHE_ALIAS]["BACKEND"]
+    if backend != FILE_BASED_CACHE:
+        return []
+    return [
+        Warning(
+            "Кэш метрик не поддерживает атомарные add и incr.",
+            hint=(
+                "Укажите в METRICS_CACHE_ALIAS кэш Redis или Memcached."
+            ),
+            id="api.W001",
+        )
+    ]
@@ -1,18 +1,70 @@
 import django_filters
+from django.db import connections
+from django.db.models import BooleanField, Case, Exists, OuterRef, Value, When
+from django.db.models.functions import Lower
 from recipe.models import Ingredient, Recipe, Tag
 
 
+TRIGRAM_INDEX_NAME = "ingredient_name_trgm_idx"
+"""GIN-индекс pg_trgm из миграции recipe 0006, создаётся не везде."""
+
+_substring_search = {}
+
+
+def substring_search_available(connection):
+    """Можно ли искать ингредиенты по подстроке.
+
+    В Postgres без pg_trgm условие LIKE '%...%' читает всю таблицу,
+    поэтому поиск ведётся только по началу названия через индекс
+    ingredient_name_prefix_idx. Результат проверки хранится до
+    перезапуска процесса.
+    """
+    if connection.vendor != "postgresql":
+        return True
+    if connection.alias not in _substring_search:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_indexes "
+                "WHERE indexname = %s)",
+                [TRIGRAM_INDEX_NAME],
+            )
+            _substring_search[connection.alias] = cursor.fetchone()[0]
+    return _substring_search[connection.alias]
+
+
 class IngredientFilter(django_filters.FilterSet):
     """Фильтр для модели Ингредиентов."""
 
-    name = django_filters.CharFilter(
-        field_name="name", lookup_expr="istartswith"
-    )
+    name = django_filters.CharFilter(method="name_filter")
 
     class Meta:
         model = Ingredient
         fields = ("name",)
 
+    def name_filter(self, queryset, name, value):
+        """Поиск по подстроке lower(name), совпадения по началу названия
+        выводятся первыми.
+
+        Условие LIKE '%...%' обслуживает GIN-индекс pg_trgm
+        (миграция 0006). Если расширение не установлено, ищутся только
+        совпадения по началу через индекс lower(name) text_pattern_ops.
+        """
+        value = value.lower()
+        queryset = queryset.annotate(name_lower=Lower("name"))
+        if not substring_search_available(connections[queryset.db]):
+            return queryset.filter(
+                name_lower__startswith=value
+            ).order_by("name")
+        return queryset.filter(
+            name_lower__contains=value
+        ).annotate(
+            is_prefix=Case(
+                When(name_lower__startswith=value, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        ).order_by("-is_prefix", "name")
+
 
 class RecipeFilter(django_filters.FilterSet):
     """Фильтр для модели Рецептов."""
@@ -20,7 +72,8 @@ class RecipeFilter(django_filters.FilterSet):
     tags = django_filters.ModelMultipleChoiceFilter(
         field_name="tags__slug",
         to_field_name="slug",
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method="tags_filter"
     )
     is_favorited = django_filters.filters.CharFilter(
         method="is_favorited_filter"
@@ -33,14 +86,27 @@ class RecipeFilter(django_filters.FilterSet):
         model = Recipe
         fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
 
+    def tags_filter(self, queryset, name, value):
+        """Фильтрация через EXISTS, без JOIN и DISTINCT."""
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef("id"),
+                    tag_id__in=[tag.id for tag in value]
+                )
+            )
+        )
+
     def is_in_shopping_cart_filter(self, queryset, name, value):
         user = self.request.user
         if value == "1" and not user.is_anonymous:
-            return queryset.filter(recipe_shoppingcart_related__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     def is_favorited_filter(self, queryset, name, value):
         user = self.request.user
         if value == "1" and not user.is_anonymous:
-            return queryset.filter(recipe_favorite_related__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import io
+import logging
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+from recipe.thumbnails import render_thumbnails
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from backend.constants import IMAGE_FORMATS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+class ImageProcessingUnavailable(APIException):
+    """Пул обработки изображений перегружен."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер занят обработкой изображений, повторите позже."
+    default_code = "image_processing_unavailable"
+
+
+def process_image(data, max_size):
+    """Декодирование, проверка и перекодирование картинки в Base64.
+
+    Выполняется в процессе пула, возвращает содержимое и расширение файла.
+    """
+    _, _, encoded = data.partition(";base64,")
+    if not encoded:
+        raise ValueError("Некорректный формат изображения.")
+    if len(encoded) * 3 // 4 > max_size:
+        raise ValueError(
+            f"Размер изображения не должен превышать {max_size} байт."
+        )
+    try:
+        content = base64.b64decode(encoded)
+        with warnings.catch_warnings():
+            # Картинки больше MAX_IMAGE_PIXELS отклоняются так же,
+            # как вдвое большие, на которых Pillow сам вызывает ошибку.
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            Image.open(io.BytesIO(content)).verify()
+            image = Image.open(io.BytesIO(content))
+            image.load()
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValueError("Слишком большое разрешение изображения.")
+    except (binascii.Error, UnidentifiedImageError, OSError, SyntaxError):
+        raise ValueError("Загрузите корректное изображение.")
+    image_format = image.format
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(
+            f"Допустимые форматы изображений: {', '.join(IMAGE_FORMATS)}."
+        )
+    params = {"quality": "keep"} if image_format == "JPEG" else {}
+    buffer = io.BytesIO()
+    try:
+        image.save(buffer, image_format, **params)
+    except (OSError, ValueError):
+        raise ValueError("Загрузите корректное изображение.")
+    return buffer.getvalue(), image_format.lower()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+            _slots = threading.BoundedSemaphore(
+                settings.IMAGE_MAX_CONCURRENCY
+            )
+    return _executor, _slots
+
+
+def _submit(fn, *args):
+    """Задача в пуле процессов, если в нём есть место.
+
+    Место освобождается, когда задача действительно завершилась:
+    после таймаута запущенная задача продолжает занимать процесс.
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise ImageProcessingUnavailable()
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def decode_base64_image(data):
+    """Обработка картинки в пуле процессов с ограничением нагрузки.
+
+    При IMAGE_WORKERS = 0 картинка обрабатывается в текущем процессе.
+    """
+    if not settings.IMAGE_WORKERS:
+        return process_image(data, settings.IMAGE_MAX_SIZE)
+    future = _submit(process_image, data, settings.IMAGE_MAX_SIZE)
+    try:
+        return future.result(timeout=settings.IMAGE_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise ImageProcessingUnavailable(
+            "Превышено время обработки изображения."
+        )
+
+
+def _log_thumbnail_error(name, future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(
+            "Не удалось создать превью %s", name,
+            exc_info=future.exception(),
+        )
+
+
+def generate_thumbnails(image):
+    """Создание превью картинки рецепта в пуле процессов без ожидания.
+
+    Если пул занят или IMAGE_WORKERS = 0, превью создаются в текущем
+    процессе, чтобы у загруженной картинки не осталось ссылок на
+    отсутствующие файлы.
+    """
+    if settings.IMAGE_WORKERS:
+        try:
+            future = _submit(render_thumbnails, image.storage, image.name)
+        except ImageProcessingUnavailable:
+            pass
+        else:
+            future.add_done_callback(
+                partial(_log_thumbnail_error, image.name)
+            )
+            return future
+    render_thumbnails(image.storage, image.name)
+    return None
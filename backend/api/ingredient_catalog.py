@@ -0,0 +1,61 @@
+import threading
+from bisect import bisect_left
+
+from recipe.models import Ingredient
+
+from .versions import INGREDIENTS, get_version
+
+
+class IngredientCatalog:
+    """Справочник ингредиентов в памяти процесса для автодополнения.
+
+    Названия хранятся отсортированными по casefold, поиск по началу
+    названия выполняется бинарным поиском, по подстроке — перебором.
+    """
+
+    def __init__(self, ingredients, version):
+        self.version = version
+        self.by_id = [
+            {
+                "id": ingredient.id,
+                "name": ingredient.name,
+                "measurement_unit": ingredient.measurement_unit,
+            }
+            for ingredient in ingredients
+        ]
+        self.by_name = sorted(
+            self.by_id, key=lambda item: (item["name"].casefold(), item["id"])
+        )
+        self.keys = [item["name"].casefold() for item in self.by_name]
+
+    def search(self, value):
+        """Совпадения по началу названия, затем по подстроке."""
+        value = value.casefold()
+        start = bisect_left(self.keys, value)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(value):
+            end += 1
+        substring_matches = [
+            item for key, item in zip(self.keys, self.by_name)
+            if value in key and not key.startswith(value)
+        ]
+        return self.by_name[start:end] + substring_matches
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Справочник, перезагружаемый при изменении версии ингредиентов."""
+    global _catalog
+    version = get_version(INGREDIENTS)
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = IngredientCatalog(
+                    Ingredient.objects.order_by("id"), version
+                )
+            catalog = _catalog
+    return catalog
@@ -0,0 +1,165 @@
+import json
+import statistics
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+from recipe.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1], 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время ответа и количество запросов к базе для основных "
+        "эндпоинтов API и выводит результат в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Очищать кэш перед каждым запросом.",
+        )
+        parser.add_argument(
+            "--endpoint", action="append", dest="endpoints",
+            help="Замерить только указанные эндпоинты.",
+        )
+        parser.add_argument(
+            "--output", help="Файл для результата вместо stdout.",
+        )
+
+    def get_user(self):
+        """Самый активный пользователь: с наибольшим списком покупок
+        и числом подписок."""
+        user = User.objects.annotate(
+            carts=Count("recipe_shoppingcart_related", distinct=True),
+            subscriptions_count=Count("subscribers", distinct=True),
+        ).order_by("-carts", "-subscriptions_count").first()
+        if user is None:
+            raise CommandError(
+                "Нет данных, выполните seed_benchmark_data."
+            )
+        return user
+
+    def get_endpoints(self):
+        """Имя, адрес и необходимость авторизации для каждого замера."""
+        recipe = Recipe.objects.order_by("-favorites_count").first()
+        author = User.objects.order_by("-recipes_count").first()
+        tags = "&".join(
+            f"tags={slug}"
+            for slug in Tag.objects.values_list("slug", flat=True)[:2]
+        )
+        ingredient = Ingredient.objects.order_by("id").first()
+        prefix = ingredient.name[:2] if ingredient else "а"
+        endpoints = {
+            "recipes_list_anonymous": ("/api/recipes/", False),
+            "recipes_list": ("/api/recipes/", True),
+            "recipes_page_1000": ("/api/recipes/?limit=1000", True),
+            "recipes_tags": (f"/api/recipes/?{tags}", True),
+            "recipes_author": (f"/api/recipes/?author={author.id}", True),
+            "recipes_favorited": ("/api/recipes/?is_favorited=1", True),
+            "recipes_in_shopping_cart": (
+                "/api/recipes/?is_in_shopping_cart=1", True
+            ),
+            "recipes_cursor": ("/api/recipes/?cursor=", True),
+            "recipes_feed": ("/api/recipes/feed/", True),
+            "subscriptions": (
+                "/api/users/subscriptions/?recipes_limit=3", True
+            ),
+            "download_shopping_cart": (
+                "/api/recipes/download_shopping_cart/", True
+            ),
+            "ingredients_autocomplete": (
+                f"/api/ingredients/?name={prefix}", False
+            ),
+        }
+        if recipe is not None:
+            endpoints["recipe_detail"] = (f"/api/recipes/{recipe.id}/", True)
+        return endpoints
+
+    def measure(self, client, url, cold):
+        if cold:
+            caches["default"].clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed, len(queries.captured_queries)
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("Нужно не меньше двух итераций.")
+        setup_test_environment()
+        try:
+            results = self.run(options)
+        finally:
+            teardown_test_environment()
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def run(self, options):
+        user = self.get_user()
+        anonymous = Client()
+        token, _ = Token.objects.get_or_create(user=user)
+        authorized = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        endpoints = self.get_endpoints()
+        unknown = set(options["endpoints"] or ()) - endpoints.keys()
+        if unknown:
+            raise CommandError(
+                f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}"
+            )
+        results = {}
+        for name, (url, authenticated) in endpoints.items():
+            if options["endpoints"] and name not in options["endpoints"]:
+                continue
+            client = authorized if authenticated else anonymous
+            for _ in range(options["warmup"]):
+                self.measure(client, url, options["cold"])
+            timings, query_counts, statuses = [], [], set()
+            for _ in range(options["iterations"]):
+                status, elapsed, query_count = self.measure(
+                    client, url, options["cold"]
+                )
+                statuses.add(status)
+                timings.append(elapsed)
+                query_counts.append(query_count)
+            quantiles = statistics.quantiles(
+                timings, n=100, method="inclusive"
+            )
+            results[name] = {
+                "url": url,
+                "status": sorted(statuses),
+                "p50_ms": percentile(quantiles, 50),
+                "p95_ms": percentile(quantiles, 95),
+                "p99_ms": percentile(quantiles, 99),
+                "mean_ms": round(statistics.mean(timings), 2),
+                "queries_min": min(query_counts),
+                "queries_max": max(query_counts),
+            }
+        return {
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "cold_cache": options["cold"],
+            "user_id": user.id,
+            "endpoints": results,
+        }
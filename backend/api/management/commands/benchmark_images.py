@@ -0,0 +1,106 @@
+import base64
+import io
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.images import ImageProcessingUnavailable, decode_base64_image
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .benchmark_api import percentile
+
+
+def make_image(size, image_format):
+    """Картинка из случайного шума в Base64: плохо сжимается и даёт
+    payload размером в несколько мегабайт."""
+    image = Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=95)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/{image_format.lower()};base64,{encoded}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет обработку одновременных загрузок больших картинок "
+        "в пуле процессов и в потоке запроса и выводит результат в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=64)
+        parser.add_argument(
+            "--concurrency", type=int, default=16,
+            help="Количество одновременных загрузок.",
+        )
+        parser.add_argument(
+            "--size", type=int, default=1600,
+            help="Сторона картинки в пикселях.",
+        )
+        parser.add_argument(
+            "--format", default="JPEG", choices=("JPEG", "PNG", "WEBP"),
+        )
+        parser.add_argument(
+            "--output", help="Файл для результата вместо stdout.",
+        )
+
+    def upload(self, data):
+        start = time.perf_counter()
+        try:
+            decode_base64_image(data)
+            result = "ok"
+        except ImageProcessingUnavailable:
+            result = "unavailable"
+        return result, (time.perf_counter() - start) * 1000
+
+    def run(self, data, uploads, concurrency):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            results = list(threads.map(self.upload, [data] * uploads))
+        elapsed = time.perf_counter() - start
+        timings = [timing for result, timing in results if result == "ok"]
+        report = {
+            "total_s": round(elapsed, 3),
+            "ok": len(timings),
+            "unavailable": uploads - len(timings),
+            "uploads_per_s": round(len(timings) / elapsed, 2),
+        }
+        if len(timings) >= 2:
+            quantiles = statistics.quantiles(
+                timings, n=100, method="inclusive"
+            )
+            report.update({
+                "p50_ms": percentile(quantiles, 50),
+                "p95_ms": percentile(quantiles, 95),
+                "p99_ms": percentile(quantiles, 99),
+            })
+        return report
+
+    def handle(self, *args, **options):
+        if options["uploads"] < 1 or options["concurrency"] < 1:
+            raise CommandError("Нужна хотя бы одна загрузка и один поток.")
+        data = make_image(options["size"], options["format"])
+        uploads, concurrency = options["uploads"], options["concurrency"]
+        # Прогрев пула, чтобы запуск процессов не попал в замер.
+        self.upload(data)
+        results = {
+            "pool": self.run(data, uploads, concurrency),
+        }
+        with override_settings(IMAGE_WORKERS=0):
+            results["inline"] = self.run(data, uploads, concurrency)
+        report = json.dumps({
+            "timestamp": timezone.now().isoformat(),
+            "payload_bytes": len(data),
+            "uploads": uploads,
+            "concurrency": concurrency,
+            "results": results,
+        }, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,97 @@
+import json
+import random
+import statistics
+import time
+
+from api.filters import IngredientFilter
+from api.ingredient_catalog import get_catalog
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recipe.models import Ingredient
+
+from .benchmark_api import percentile
+
+
+def database_search(value):
+    return list(
+        IngredientFilter(
+            data={"name": value}, queryset=Ingredient.objects.all()
+        ).qs.values("id", "name", "measurement_unit")
+    )
+
+
+def catalog_search(value):
+    return get_catalog().search(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время автодополнения ингредиентов запросом к базе "
+        "и по справочнику в памяти и выводит результат в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--output", help="Файл для результата вместо stdout.",
+        )
+
+    def get_queries(self, rng, count):
+        """Начала названий длиной 1–4 символа и подстроки из середины,
+        как при наборе в редакторе рецепта."""
+        names = list(Ingredient.objects.values_list("name", flat=True))
+        if not names:
+            raise CommandError("Нет ингредиентов, выполните load_ingredients.")
+        queries = []
+        for name in rng.choices(names, k=count):
+            length = rng.randint(1, min(4, len(name)))
+            start = rng.choice((0, rng.randrange(len(name) - length + 1)))
+            queries.append(name[start:start + length])
+        return queries
+
+    def measure(self, search, queries):
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for value in queries:
+                start = time.perf_counter()
+                search(value)
+                timings.append((time.perf_counter() - start) * 1000)
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "p99_ms": percentile(quantiles, 99),
+            "mean_ms": round(statistics.mean(timings), 4),
+            "queries": len(context.captured_queries),
+        }
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("Нужно не меньше двух итераций.")
+        queries = self.get_queries(
+            random.Random(options["seed"]), options["iterations"]
+        )
+        # Загрузка справочника не входит в замер.
+        get_catalog()
+        results = {
+            "database": self.measure(database_search, queries),
+            "catalog": self.measure(catalog_search, queries),
+        }
+        results["speedup"] = round(
+            results["database"]["mean_ms"] / results["catalog"]["mean_ms"], 1
+        )
+        report = json.dumps({
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "ingredients": len(get_catalog().by_id),
+            "iterations": options["iterations"],
+            "results": results,
+        }, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,201 @@
+import json
+import statistics
+import time
+
+from api.membership import UserMembership
+from api.serializers import (IngredientSerializer, RecipeReadListSerializer,
+                             RecipeReadSerializer, RecipeShortInfoSerializer)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Prefetch, prefetch_related_objects
+from django.test.utils import override_settings
+from django.utils import timezone
+from recipe.models import Recipe, RecipeIngredient
+from recipe.thumbnails import thumbnail_urls
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import User
+
+from .benchmark_api import percentile
+
+
+class LegacyThumbnailField(serializers.Field):
+    """ThumbnailField до перехода на api.representations."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "image")
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get("request")
+        urls = thumbnail_urls(value)
+        if request is not None:
+            return {
+                size: request.build_absolute_uri(url)
+                for size, url in urls.items()
+            }
+        return urls
+
+
+class LegacyRecipeShortInfoSerializer(serializers.ModelSerializer):
+    """RecipeShortInfoSerializer с полями DRF для каждого объекта."""
+
+    image_thumbnail = LegacyThumbnailField()
+
+    class Meta:
+        model = Recipe
+        fields = RecipeShortInfoSerializer.Meta.fields
+
+
+class LegacyRecipeReadSerializer(RecipeReadSerializer):
+    """RecipeReadSerializer, строящий представление полями DRF."""
+
+    image_thumbnail = LegacyThumbnailField()
+
+    class Meta(RecipeReadSerializer.Meta):
+        list_serializer_class = RecipeReadListSerializer
+
+    def public_representations(self, recipes):
+        prefetch_related_objects(
+            recipes,
+            "tags",
+            Prefetch(
+                "recipe_ingredient",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredients"
+                )
+            )
+        )
+        return {
+            recipe.id: serializers.ModelSerializer.to_representation(
+                self, recipe
+            )
+            for recipe in recipes
+        }
+
+    def get_ingredients(self, obj):
+        return [
+            {
+                **IngredientSerializer(ingredient.ingredients).data,
+                "amount": ingredient.amount
+            }
+            for ingredient in obj.recipe_ingredient.all()
+        ]
+
+
+SERIALIZERS = {
+    "recipe_read": (LegacyRecipeReadSerializer, RecipeReadSerializer),
+    "recipe_short": (LegacyRecipeShortInfoSerializer,
+                     RecipeShortInfoSerializer),
+}
+
+
+def make_request(user=None):
+    """GET /api/recipes/ от имени user или анонимного пользователя."""
+    request = Request(APIRequestFactory().get("/api/recipes/"))
+    if user is not None:
+        request.user = user
+    return request
+
+
+def render(serializer_class, recipes, request):
+    """JSON-ответ сериализатора в байтах, как его отдаёт API."""
+    context = {
+        "request": request,
+        "membership": UserMembership.for_request(request),
+    }
+    data = serializer_class(recipes, many=True, context=context).data
+    return JSONRenderer().render(data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает вывод и время прежних сериализаторов рецептов "
+        "на полях DRF и текущих на api.representations и выводит "
+        "результат в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument(
+            "--user", type=int,
+            help="id пользователя запроса, по умолчанию аноним.",
+        )
+        parser.add_argument(
+            "--output", help="Файл для результата вместо stdout.",
+        )
+
+    def get_recipes(self, count):
+        """Свежие объекты без предзагрузки для каждого прогона."""
+        return list(Recipe.objects.select_related("author")[:count])
+
+    def measure(self, serializer_class, count, request, iterations):
+        timings = []
+        for _ in range(iterations):
+            recipes = self.get_recipes(count)
+            start = time.perf_counter()
+            render(serializer_class, recipes, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "mean_ms": round(statistics.mean(timings), 2),
+        }
+
+    def compare(self, legacy, current, count, request, iterations):
+        identical = render(
+            legacy, self.get_recipes(count), request
+        ) == render(current, self.get_recipes(count), request)
+        results = {
+            "identical": identical,
+            "legacy": self.measure(legacy, count, request, iterations),
+            "current": self.measure(current, count, request, iterations),
+        }
+        results["speedup"] = round(
+            results["legacy"]["mean_ms"] / results["current"]["mean_ms"], 1
+        )
+        return results
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("Нужно не меньше двух итераций.")
+        recipes = Recipe.objects.count()
+        if not recipes:
+            raise CommandError("Нет рецептов, выполните seed_benchmark_data.")
+        user = None
+        if options["user"] is not None:
+            user = User.objects.filter(pk=options["user"]).first()
+            if user is None:
+                raise CommandError("Пользователь не найден.")
+        count = min(options["count"], recipes)
+        # Сравниваются сериализаторы, а не кэш представлений.
+        with override_settings(RECIPE_REPRESENTATION_CACHE=False):
+            results = {
+                name: self.compare(
+                    legacy, current, count, make_request(user),
+                    options["iterations"],
+                )
+                for name, (legacy, current) in SERIALIZERS.items()
+            }
+        report = json.dumps({
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "recipes": count,
+            "user": options["user"],
+            "iterations": options["iterations"],
+            "results": results,
+        }, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+        if not all(result["identical"] for result in results.values()):
+            raise CommandError("Вывод сериализаторов различается.")
@@ -0,0 +1,197 @@
+import random
+from itertools import islice
+
+from api.versions import (INGREDIENTS, RECIPE_COUNT, RECIPE_LIST, TAGS,
+                          bump_version)
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipe.management.commands.load_ingredients import DEFAULT_PATH
+from recipe.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                           RecipeIngredient, ShoppingCart, Tag)
+from users.models import Subscription, User
+
+BATCH_SIZE = 1000
+PASSWORD = "benchmark"
+TAGS_DATA = (
+    ("Завтрак", "breakfast"),
+    ("Обед", "lunch"),
+    ("Ужин", "dinner"),
+    ("Десерт", "dessert"),
+    ("Выпечка", "bakery"),
+)
+
+
+def zipf_weights(count, alpha):
+    """Веса степенного распределения: первые элементы популярнее."""
+    return [1 / rank ** alpha for rank in range(1, count + 1)]
+
+
+def sample_pairs(rng, left, left_weights, right, right_weights, count,
+                 allow_same=True):
+    """Уникальные пары со степенным распределением по обеим сторонам."""
+    pairs = set()
+    limit = len(left) * len(right)
+    attempts = 0
+    while len(pairs) < min(count, limit) and attempts < count * 10:
+        size = count - len(pairs)
+        for first, second in zip(
+            rng.choices(left, left_weights, k=size),
+            rng.choices(right, right_weights, k=size),
+        ):
+            if allow_same or first != second:
+                pairs.add((first, second))
+        attempts += size
+    return list(islice(pairs, count))
+
+
+class Command(BaseCommand):
+    help = "Создаёт синтетические данные для нагрузочного тестирования API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--favorites", type=int, default=20000)
+        parser.add_argument("--carts", type=int, default=5000)
+        parser.add_argument("--subscriptions", type=int, default=10000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8,
+            help="Максимальное количество ингредиентов в рецепте.",
+        )
+        parser.add_argument(
+            "--alpha", type=float, default=1.1,
+            help="Показатель степенного распределения популярности.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--prefix", default="bench",
+            help="Префикс имён созданных пользователей и рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(
+                f"Данные с префиксом {prefix} уже созданы, "
+                "укажите другой --prefix."
+            )
+        rng = random.Random(options["seed"])
+        alpha = options["alpha"]
+        if not Ingredient.objects.exists():
+            call_command("load_ingredients", str(DEFAULT_PATH))
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug) for name, slug in TAGS_DATA
+            )
+        tag_ids = list(Tag.objects.values_list("id", flat=True))
+
+        with transaction.atomic():
+            user_ids = self.create_users(prefix, options["users"])
+            recipe_ids, author_ids = self.create_recipes(
+                rng, prefix, options["recipes"], user_ids,
+                zipf_weights(len(user_ids), alpha),
+            )
+            self.create_recipe_relations(
+                rng, recipe_ids, tag_ids, ingredient_ids,
+                options["ingredients_per_recipe"],
+            )
+            recipe_weights = zipf_weights(len(recipe_ids), alpha)
+            user_weights = zipf_weights(len(user_ids), alpha)
+            for model, option in (
+                (Favorite, "favorites"), (ShoppingCart, "carts")
+            ):
+                self.bulk_create(model, (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in sample_pairs(
+                        rng, user_ids, user_weights,
+                        recipe_ids, recipe_weights, options[option],
+                    )
+                ))
+            authors = sorted(set(author_ids))
+            subscriptions = sample_pairs(
+                rng, user_ids, user_weights,
+                authors, zipf_weights(len(authors), alpha),
+                options["subscriptions"], allow_same=False,
+            )
+            self.bulk_create(Subscription, (
+                Subscription(subscriber_id=subscriber_id,
+                             subscribed_to_id=author_id)
+                for subscriber_id, author_id in subscriptions
+            ))
+
+        call_command("recount", stdout=self.stdout)
+        call_command("rebuild_shopping_list", stdout=self.stdout)
+        for subscriber_id, author_id in subscriptions:
+            FeedEntry.objects.follow(subscriber_id, author_id)
+        for name in (RECIPE_COUNT, RECIPE_LIST, TAGS, INGREDIENTS):
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано пользователей: {len(user_ids)}, "
+            f"рецептов: {len(recipe_ids)}, подписок: {len(subscriptions)}. "
+            f"Пароль пользователей: {PASSWORD}"
+        ))
+
+    @staticmethod
+    def bulk_create(model, objects):
+        objects = iter(objects)
+        while batch := list(islice(objects, BATCH_SIZE)):
+            model.objects.bulk_create(batch)
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        self.bulk_create(User, (
+            User(
+                username=f"{prefix}_{number}",
+                email=f"{prefix}_{number}@example.com",
+                first_name="Имя",
+                last_name=f"Фамилия {number}",
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(
+            User.objects.filter(
+                username__startswith=f"{prefix}_"
+            ).order_by("id").values_list("id", flat=True)
+        )
+
+    def create_recipes(self, rng, prefix, count, user_ids, user_weights):
+        author_ids = rng.choices(user_ids, user_weights, k=count)
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f"{prefix} рецепт {number}",
+                text="Описание рецепта. " * rng.randint(1, 20),
+                cooking_time=rng.randint(1, 180),
+            )
+            for number, author_id in enumerate(author_ids)
+        ))
+        recipes = Recipe.objects.filter(
+            name__startswith=f"{prefix} рецепт "
+        ).order_by("id").values_list("id", "author_id")
+        recipe_ids = [recipe_id for recipe_id, _ in recipes]
+        return recipe_ids, [author_id for _, author_id in recipes]
+
+    def create_recipe_relations(self, rng, recipe_ids, tag_ids,
+                                ingredient_ids, max_ingredients):
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, rng.randint(1, min(3, len(tag_ids)))
+            )
+        ))
+        self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredients_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids,
+                rng.randint(1, min(max_ingredients, len(ingredient_ids))),
+            )
+        ))
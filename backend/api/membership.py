@@ -0,0 +1,57 @@
+from django.utils.functional import cached_property
+from recipe.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class UserMembership:
+    """Подписки, избранное и список покупок пользователя запроса.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и используется всеми сериализаторами в рамках запроса.
+    """
+
+    cached_fields = ("subscribed_ids", "favorite_ids", "shopping_cart_ids")
+
+    def __init__(self, user):
+        self.user = user
+
+    @classmethod
+    def for_request(cls, request):
+        """Возвращает общий для запроса экземпляр кэша."""
+        if not hasattr(request, "_membership"):
+            request._membership = cls(request.user)
+        return request._membership
+
+    def _load(self, model, user_field, id_field):
+        if self.user.is_anonymous:
+            return frozenset()
+        return frozenset(
+            model.objects.filter(
+                **{user_field: self.user}
+            ).values_list(id_field, flat=True)
+        )
+
+    @cached_property
+    def subscribed_ids(self):
+        return self._load(Subscription, "subscriber", "subscribed_to_id")
+
+    @cached_property
+    def favorite_ids(self):
+        return self._load(Favorite, "user", "recipe_id")
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self._load(ShoppingCart, "user", "recipe_id")
+
+    def invalidate(self):
+        """Сброс кэша после записи в рамках того же запроса."""
+        for field in self.cached_fields:
+            self.__dict__.pop(field, None)
+
+
+def get_membership(context):
+    """Кэш из контекста сериализатора или из запроса."""
+    membership = context.get("membership")
+    if membership is None and context.get("request") is not None:
+        membership = UserMembership.for_request(context["request"])
+    return membership
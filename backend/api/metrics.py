@@ -0,0 +1,154 @@
+"""Счётчики запросов API, общие для всех процессов.
+
+Счётчики хранятся в кэше METRICS_CACHE_ALIAS и рассчитаны на атомарные
+add и incr (Redis, Memcached; LocMemCache — в пределах процесса).
+FileBasedCache для метрик не поддерживается: add и incr в нём
+не атомарны, и при нескольких воркерах приращения теряются.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+METRIC_PREFIX = "foodgram_"
+MICROSECONDS_METRICS = (
+    "api_sql_seconds_total",
+    "api_serialization_seconds_total",
+)
+"""Метрики, которые хранятся в микросекундах, а выводятся в секундах."""
+
+NAMES_BATCH_SIZE = 100
+"""Сколько ячеек реестра имён читается за одно обращение к кэшу."""
+
+_pending = defaultdict(int)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_registered = set()
+
+
+def _cache():
+    return caches[settings.METRICS_CACHE_ALIAS]
+
+
+def _metric_key(name):
+    return f"metrics:{name}"
+
+
+def _slot_key(slot):
+    return f"metrics:names:{slot}"
+
+
+def _register(name):
+    """Запись имени в реестр: каждое имя занимает свою ячейку.
+
+    Ячейка занимается через add, поэтому воркеры, одновременно
+    регистрирующие разные имена, не перезаписывают друг друга.
+    """
+    if name in _registered:
+        return
+    cache = _cache()
+    slot = 0
+    while not cache.add(_slot_key(slot), name, timeout=None):
+        if cache.get(_slot_key(slot)) == name:
+            break
+        slot += 1
+    _registered.add(name)
+
+
+def _registered_names():
+    """Имена из реестра: ячейки заполняются подряд с нулевой."""
+    cache = _cache()
+    names = set()
+    start = 0
+    while True:
+        keys = [
+            _slot_key(slot)
+            for slot in range(start, start + NAMES_BATCH_SIZE)
+        ]
+        values = cache.get_many(keys)
+        names.update(values.values())
+        if len(values) < len(keys):
+            return names
+        start += NAMES_BATCH_SIZE
+
+
+def _store(name, value):
+    cache = _cache()
+    key = _metric_key(name)
+    if cache.add(key, 0, timeout=None):
+        # Счётчик создан заново, например после очистки кэша:
+        # имя регистрируется повторно.
+        _registered.discard(name)
+    _register(name)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, timeout=None)
+
+
+def _take_pending(force=False):
+    global _last_flush
+    with _pending_lock:
+        now = time.monotonic()
+        if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return {}
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = now
+    return pending
+
+
+def increment(name, value=1):
+    """Увеличивает счётчик name, общий для всех процессов.
+
+    Имя вида "метрика:метка" выводится как метрика с меткой action.
+    Значения копятся в процессе и записываются в кэш не чаще раза
+    в METRICS_FLUSH_INTERVAL секунд.
+    """
+    with _pending_lock:
+        _pending[name] += value
+    flush(force=False)
+
+
+def flush(force=True):
+    for name, value in _take_pending(force).items():
+        if value:
+            _store(name, value)
+
+
+def get_counter(name):
+    flush()
+    return _cache().get(_metric_key(name), 0)
+
+
+def get_counters():
+    flush()
+    names = _registered_names()
+    values = _cache().get_many([_metric_key(name) for name in names])
+    return {name: values.get(_metric_key(name), 0) for name in names}
+
+
+def _escape(value):
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def render_prometheus():
+    """Все счётчики в текстовом формате Prometheus."""
+    samples = defaultdict(list)
+    for name, value in sorted(get_counters().items()):
+        metric, _, label = name.partition(":")
+        if not metric.endswith("_total"):
+            metric += "_total"
+        if metric in MICROSECONDS_METRICS:
+            value /= 1_000_000
+        labels = f'{{action="{_escape(label)}"}}' if label else ""
+        samples[metric].append(f"{METRIC_PREFIX}{metric}{labels} {value}")
+    lines = []
+    for metric, metric_samples in samples.items():
+        lines.append(f"# TYPE {METRIC_PREFIX}{metric} counter")
+        lines.extend(metric_samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,104 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import increment
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов к базе, чем разрешено."""
+
+
+class RequestStats:
+    """Запросы к базе и время обработки одного HTTP-запроса.
+
+    Метку и бюджет запросов задаёт InstrumentedViewMixin, он же
+    учитывает время сериализации и отмечает в budget_start число
+    запросов, выполненных до действия представления.
+    """
+
+    def __init__(self):
+        self.label = None
+        self.query_budget = None
+        self.budget_start = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class QueryInstrumentationMiddleware:
+    """Учёт запросов к базе, времени SQL и сериализации и размера ответа.
+
+    Результат добавляется в заголовок Server-Timing и в счётчики
+    api/_metrics, превышение бюджета запросов логируется или, при
+    QUERY_BUDGET_STRICT, вызывает QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        request.instrumentation = stats
+        start = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        total_time = time.perf_counter() - start
+        response["Server-Timing"] = (
+            f'db;dur={stats.sql_time * 1000:.1f};'
+            f'desc="{stats.queries} queries", '
+            f"serialize;dur={stats.serialization_time * 1000:.1f}, "
+            f"app;dur={total_time * 1000:.1f}"
+        )
+        label = stats.label or getattr(
+            request.resolver_match, "view_name", None
+        )
+        if label is not None:
+            self.record(label, stats, response)
+            self.check_budget(label, stats)
+        return response
+
+    @staticmethod
+    def record(label, stats, response):
+        increment(f"api_requests_total:{label}")
+        increment(f"api_queries_total:{label}", stats.queries)
+        increment(
+            f"api_sql_seconds_total:{label}",
+            round(stats.sql_time * 1_000_000),
+        )
+        increment(
+            f"api_serialization_seconds_total:{label}",
+            round(stats.serialization_time * 1_000_000),
+        )
+        if not response.streaming:
+            increment(
+                f"api_response_bytes_total:{label}", len(response.content)
+            )
+
+    @staticmethod
+    def check_budget(label, stats):
+        if stats.query_budget is None:
+            return
+        queries = stats.queries - stats.budget_start
+        if queries <= stats.query_budget:
+            return
+        increment(f"api_query_budget_exceeded_total:{label}")
+        message = (
+            f"{label}: {queries} запросов к базе "
+            f"при бюджете {stats.query_budget}"
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,153 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .metrics import increment
+from .versions import get_version
+
+
+class InstrumentedViewMixin:
+    """Метка действия, бюджет запросов и время сериализации для
+    QueryInstrumentationMiddleware.
+
+    Бюджеты задаются словарём query_budgets {действие: число запросов}
+    и не включают запросы аутентификации и проверки прав.
+    """
+
+    query_budgets = {}
+
+    def initial(self, request, *args, **kwargs):
+        stats = getattr(request, "instrumentation", None)
+        if stats is not None:
+            stats.label = f"{type(self).__name__}.{self.action}"
+        super().initial(request, *args, **kwargs)
+        if stats is not None:
+            stats.query_budget = self.query_budgets.get(self.action)
+            stats.budget_start = stats.queries
+
+    def instrument_serializer(self, serializer):
+        """Учёт времени to_representation корневого сериализатора."""
+        stats = getattr(self.request, "instrumentation", None)
+        if stats is None:
+            return serializer
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            start = time.perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                stats.serialization_time += time.perf_counter() - start
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+    def get_serializer(self, *args, **kwargs):
+        return self.instrument_serializer(
+            super().get_serializer(*args, **kwargs)
+        )
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы (ETag, Last-Modified, 304) для list и retrieve.
+
+    Вьюсет переопределяет get_etag_parts и, при необходимости,
+    get_last_modified; None отключает условную обработку запроса.
+    """
+
+    cache_control = {"public": True, "max_age": 0}
+
+    def get_etag_parts(self, request):
+        return None
+
+    def get_last_modified(self, request):
+        return None
+
+    def get_etag(self, request):
+        parts = self.get_etag_parts(request)
+        if parts is None:
+            return None
+        parts = (*parts, request.accepted_renderer.format)
+        digest = hashlib.md5(
+            "|".join(map(str, parts)).encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        last_modified = self.get_last_modified(request)
+        timestamp = last_modified.timestamp() if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+            patch_cache_control(response, **self.cache_control)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class AnonymousListCacheMixin:
+    """Кэш ответа list для анонимных пользователей.
+
+    Ключ строится из нормализованных параметров cache_query_params,
+    версия cache_version сбрасывается сигналами при изменении данных.
+    """
+
+    cache_version = None
+    cache_query_params = ()
+    cache_query_defaults = {}
+
+    def get_list_cache_key(self, request):
+        params = []
+        for param in self.cache_query_params:
+            values = sorted(set(request.query_params.getlist(param)))
+            if not values and param in self.cache_query_defaults:
+                values = [str(self.cache_query_defaults[param])]
+            params.extend((param, value) for value in values)
+        digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+        return (
+            f"response:{self.basename}:{get_version(self.cache_version)}:"
+            f"{request.get_host()}:{request.accepted_renderer.format}:"
+            f"{digest}"
+        )
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        key = self.get_list_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            increment(f"{self.basename}_list_cache_hit")
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        increment(f"{self.basename}_list_cache_miss")
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
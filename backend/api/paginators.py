@@ -1,8 +1,257 @@
+import base64
+import binascii
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from backend.constants import PAGE_SIZE
+from recipe.models import FeedEntry
+
+from .versions import RECIPE_COUNT, USER_RECIPE_COUNT, get_version
 
 
 class PageAndLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = PAGE_SIZE
+
+
+def estimate_count(model):
+    """Оценка числа строк таблицы по статистике Postgres (reltuples)."""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class CachedCountPagination(PageAndLimitPagination):
+    """Пагинация page/limit с кэшированием COUNT(*) по набору фильтров.
+
+    Кэш сбрасывается при создании и удалении рецептов и изменении
+    их тегов, выборки пользователя — при изменении его избранного
+    и списка покупок. Для выборки без фильтров
+    больше APPROXIMATE_COUNT_THRESHOLD используется оценка Postgres.
+    """
+
+    count_ignored_params = ("page", "limit", "cursor", "format")
+    user_dependent_params = ("is_favorited", "is_in_shopping_cart")
+
+    def get_count_key(self, request, params):
+        """Ключ количества объектов для набора фильтров.
+
+        Выборки, зависящие от пользователя, дополнительно версионируются
+        по пользователю: его избранное не сбрасывает кэш остальных.
+        """
+        signature = urlencode(params)
+        version = get_version(RECIPE_COUNT)
+        if request.user.is_authenticated and any(
+            key in self.user_dependent_params for key, _ in params
+        ):
+            signature += f"&user={request.user.id}"
+            version = (
+                f"{version}."
+                f"{get_version(USER_RECIPE_COUNT.format(request.user.id))}"
+            )
+        digest = hashlib.md5(signature.encode()).hexdigest()
+        return f"count:{version}:{request.path}:{digest}"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Страница выбирается срезом с одной лишней строкой: признак
+        следующей страницы не зависит от кэшированного или оценочного
+        количества, которое попадает только в поле count."""
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            if key not in self.count_ignored_params
+            for value in values
+        )
+        self.request = request
+        self.queryset = queryset
+        self.count_key = self.get_count_key(request, params)
+        # Оценка reltuples годится только для выборки без фильтров.
+        self.approximate = not params
+        page_size = self.get_page_size(request)
+        self.page_number = self.get_page_number_value(request)
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        if not results and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+        self.seen = offset + len(results)
+        return results
+
+    def get_page_number_value(self, request):
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            raise NotFound(self.invalid_page_message)
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+        return page_number
+
+    def get_count(self):
+        """Количество объектов: оценка Postgres, значение из кэша или
+        COUNT(*), но не меньше уже увиденных строк; на последней
+        странице количество известно точно."""
+        if not self.has_next:
+            return self.seen
+        if self.approximate and settings.APPROXIMATE_COUNT_THRESHOLD:
+            estimate = estimate_count(self.queryset.model)
+            if (
+                estimate is not None
+                and estimate >= settings.APPROXIMATE_COUNT_THRESHOLD
+            ):
+                return max(estimate, self.seen + 1)
+        count = cache.get(self.count_key)
+        if count is None:
+            count = self.queryset.count()
+            cache.set(self.count_key, count, settings.COUNT_CACHE_TIMEOUT)
+        return max(count, self.seen + 1)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.get_count(),
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1,
+        )
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+
+class PageLimitOrCursorPagination(CachedCountPagination):
+    """Пагинация page/limit с опциональным курсорным режимом.
+
+    Параметр ?cursor= включает keyset-пагинацию по (created_at, id)
+    без OFFSET и COUNT(*); пустое значение возвращает первую страницу.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params[self.cursor_query_param]
+        queryset = queryset.order_by("-created_at", "-id")
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=pk)
+            )
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.last_position = (
+            (results[-1].created_at, results[-1].id) if results else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_cursor_link(),
+            "results": data,
+        })
+
+    def get_next_cursor_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(*self.last_position),
+        )
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        position = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode()).decode()
+            created_at, pk = position.rsplit("|", 1)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+
+class FeedPagination(PageLimitOrCursorPagination):
+    """Курсорная пагинация ленты подписок.
+
+    Страница выбирается из FeedEntry по индексу (user, created_at,
+    recipe) и дополняется рецептами популярных авторов, рецепты
+    загружаются одним запросом по первичным ключам.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        before = self.decode_cursor(cursor) if cursor else None
+        filterset_class = getattr(view, "filterset_class", None)
+        filtered = filterset_class is not None and any(
+            key in request.query_params
+            for key in filterset_class.base_filters
+        )
+        rows = FeedEntry.objects.page(
+            request.user,
+            page_size + 1,
+            before=before,
+            recipes=queryset if filtered else None,
+        )
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        # Позиция курсора берётся из ленты, а не из загруженных
+        # рецептов: удалённый за это время рецепт не обрывает ленту.
+        self.last_position = rows[-1] if rows else None
+        ids = [recipe_id for _, recipe_id in rows]
+        recipes = queryset.order_by().in_bulk(ids)
+        return [recipes[pk] for pk in ids if pk in recipes]
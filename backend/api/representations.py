@@ -0,0 +1,102 @@
+"""Быстрое построение представлений рецептов для чтения.
+
+Повторяет вывод RecipeReadSerializer и RecipeShortInfoSerializer
+без создания полей DRF для каждого объекта: простые поля читаются
+заранее подготовленными attrgetter, файлы и вложенные объекты
+собираются функциями ниже.
+"""
+from operator import attrgetter
+
+from recipe.thumbnails import thumbnail_urls
+from rest_framework.settings import api_settings
+
+
+class FieldPlan:
+    """Набор простых полей модели, читаемых одним attrgetter."""
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.getter = attrgetter(*fields)
+
+    def __call__(self, obj):
+        return dict(zip(self.fields, self.getter(obj)))
+
+
+TAG_PLAN = FieldPlan("id", "name", "slug")
+INGREDIENT_PLAN = FieldPlan("id", "name", "measurement_unit")
+AUTHOR_PLAN = FieldPlan("id", "username", "first_name", "last_name", "email")
+
+
+def file_url(value, request):
+    """Адрес файла так же, как в serializers.ImageField."""
+    if not value:
+        return None
+    if not api_settings.UPLOADED_FILES_USE_URL:
+        return value.name
+    try:
+        url = value.url
+    except AttributeError:
+        return None
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def thumbnails(image, request):
+    """Адреса превью картинки рецепта по размерам."""
+    if not image:
+        return None
+    urls = thumbnail_urls(image)
+    if request is not None:
+        return {
+            size: request.build_absolute_uri(url)
+            for size, url in urls.items()
+        }
+    return urls
+
+
+def recipe_ingredients(recipe):
+    return [
+        {
+            **INGREDIENT_PLAN(recipe_ingredient.ingredients),
+            "amount": recipe_ingredient.amount,
+        }
+        for recipe_ingredient in recipe.recipe_ingredient.all()
+    ]
+
+
+def author_representation(author, request, is_subscribed):
+    return {
+        **AUTHOR_PLAN(author),
+        "is_subscribed": is_subscribed,
+        "avatar": file_url(author.avatar, request),
+    }
+
+
+def recipe_representation(recipe, request):
+    """Представление рецепта без полей, зависящих от пользователя."""
+    image = recipe.image
+    return {
+        "id": recipe.id,
+        "tags": [TAG_PLAN(tag) for tag in recipe.tags.all()],
+        "author": author_representation(recipe.author, request, False),
+        "ingredients": recipe_ingredients(recipe),
+        "is_favorited": False,
+        "is_in_shopping_cart": False,
+        "name": recipe.name,
+        "image": file_url(image, request),
+        "image_thumbnail": thumbnails(image, request),
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+    }
+
+
+def short_recipe_representation(recipe, request):
+    image = recipe.image
+    return {
+        "id": recipe.id,
+        "name": recipe.name,
+        "image": file_url(image, request),
+        "image_thumbnail": thumbnails(image, request),
+        "cooking_time": recipe.cooking_time,
+    }
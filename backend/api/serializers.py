@@ -1,34 +1,51 @@
-import base64
+import hashlib
 import uuid
 
+from django.conf import settings
+from django.core.cache import caches
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from recipe.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                           ShoppingCart, Tag)
+                           ShoppingCart, ShoppingListItem, Tag)
 from rest_framework import serializers
 from users.models import Subscription, User
 
 from backend.constants import PAGE_SIZE
 
+from .images import decode_base64_image
+from .membership import get_membership
+from .representations import (recipe_ingredients, recipe_representation,
+                              short_recipe_representation, thumbnails)
+from .versions import INGREDIENTS, TAGS, get_version
+
 
 class Base64ImageField(serializers.ImageField):
     """Настраиваемое поле для обработки кодировки изображений в Base64."""
 
-    def to_representation(self, value):
-        if value:
-            with open(value.path, "rb") as image_file:
-                string = base64.b64encode(image_file.read()).decode("utf-8")
-                return f"data:image/png;base64,{string}"
-        return None
-
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            file_name = f"{uuid.uuid4()}.{ext}"
-            data = ContentFile(base64.b64decode(imgstr), name=file_name)
-        else:
+        if not (isinstance(data, str) and data.startswith("data:image")):
             raise serializers.ValidationError("Обязательное поле")
-        return super().to_internal_value(data)
+        try:
+            content, ext = decode_base64_image(data)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+        file_name = f"{uuid.uuid4()}.{ext}"
+        data = ContentFile(content, name=file_name)
+        # Проверка Pillow уже выполнена в пуле, повторно не запускается.
+        return super(serializers.ImageField, self).to_internal_value(data)
+
+
+class ThumbnailField(serializers.Field):
+    """Адреса превью картинки рецепта."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "image")
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return thumbnails(value, self.context.get("request"))
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -42,7 +59,12 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 
 class RecipeShortInfoSerializer(serializers.ModelSerializer):
-    """Сериализатор для вывода рецепта."""
+    """Сериализатор для вывода рецепта.
+
+    Представление строится без полей DRF, см. api.representations.
+    """
+
+    image_thumbnail = ThumbnailField()
 
     class Meta:
         model = Recipe
@@ -50,9 +72,15 @@ class RecipeShortInfoSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_thumbnail",
             "cooking_time",
         )
 
+    def to_representation(self, instance):
+        return short_recipe_representation(
+            instance, self.context.get("request")
+        )
+
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     """Сериализатор для подписок."""
@@ -80,26 +108,36 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             )
         return attrs
 
+    def _is_subscribed(self, instance):
+        is_subscribed = getattr(instance, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
+        membership = get_membership(self.context)
+        if membership is not None and membership.user == instance.subscriber:
+            return instance.subscribed_to_id in membership.subscribed_ids
+        return Subscription.objects.filter(
+            subscriber=instance.subscriber,
+            subscribed_to=instance.subscribed_to
+        ).exists()
+
     def to_representation(self, instance):
         user = instance.subscribed_to
-        recipes_limit = self.context.get("recipes_limit", PAGE_SIZE)
-        recipes = user.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:recipes_limit]
+        recipes = getattr(user, "limited_recipes", None)
+        if recipes is None:
+            recipes_limit = self.context.get("recipes_limit", PAGE_SIZE)
+            recipes = user.recipes.all()
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
         recipes_data = RecipeShortInfoSerializer(recipes, many=True).data
-        subscription = Subscription.objects.filter(
-            subscriber=instance.subscriber,
-            subscribed_to=user
-        ).exists()
         return {
             "id": user.id,
             "username": user.username,
             "first_name": user.first_name,
             "last_name": user.last_name,
             "email": user.email,
-            "is_subscribed": subscription,
+            "is_subscribed": self._is_subscribed(instance),
             "recipes": recipes_data,
-            "recipes_count": getattr(instance, "recipes_count", 0),
+            "recipes_count": user.recipes_count,
             "avatar": user.avatar.url if user.avatar else None,
         }
 
@@ -158,13 +196,13 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get("request")
-        if request and not request.user.is_anonymous:
-            return Subscription.objects.filter(
-                subscriber=request.user,
-                subscribed_to=obj
-            ).exists()
-        return False
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
+        membership = get_membership(self.context)
+        if membership is None:
+            return False
+        return obj.id in membership.subscribed_ids
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -227,6 +265,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_thumbnail = ThumbnailField()
 
     class Meta:
         model = Recipe
@@ -239,6 +278,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_thumbnail",
             "text",
             "cooking_time",
         )
@@ -261,13 +301,20 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                         "Ингредиенты не должны повторяться"
                     ]}
                 )
+            ingredient_objects = Ingredient.objects.in_bulk(ingredients_ids)
+            missing_ids = [
+                ingredient_id for ingredient_id in ingredients_ids
+                if ingredient_id not in ingredient_objects
+            ]
+            if missing_ids:
+                raise serializers.ValidationError(
+                    {"ingredients": [
+                        "Такого ингредиента не существует: "
+                        + ", ".join(map(str, missing_ids))
+                    ]}
+                )
             for ingredient in ingredients:
-                if not Ingredient.objects.filter(id=ingredient["id"]).exists():
-                    raise serializers.ValidationError(
-                        {"ingredients": [
-                            "Такого ингредиента не существует"
-                        ]}
-                    )
+                ingredient["ingredient"] = ingredient_objects[ingredient["id"]]
                 if ingredient["amount"] <= 0:
                     raise serializers.ValidationError(
                         {"ingredients": [
@@ -284,19 +331,66 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return attrs
 
     def _update_tags_and_ingredients(self, recipe, tags, ingredients):
-        """Обновление тегов и ингредиентов для рецепта."""
-        recipe.tags.set(tags)
-        recipe.recipe_ingredient.all().delete()
-        recipe_ingredients = [
-            RecipeIngredient(
-                ingredients_id=ingredient_data["id"],
-                recipe=recipe,
-                amount=ingredient_data["amount"]
-            )
+        """Обновление тегов и ингредиентов для рецепта.
+
+        Изменяются только добавленные, удалённые и изменённые строки.
+        """
+        tag_ids = {tag.id for tag in tags}
+        if tag_ids != set(recipe.tags.values_list("id", flat=True)):
+            recipe.tags.set(tags)
+        existing = {
+            row.ingredients_id: row
+            for row in recipe.recipe_ingredient.order_by("id")
+        }
+        amounts = {
+            ingredient_data["id"]: ingredient_data["amount"]
             for ingredient_data in ingredients
+        }
+        # Удалённые строки учитывает в списках покупок сигнал post_delete,
+        # bulk_create и bulk_update сигналов не отправляют.
+        ShoppingListItem.objects.change_recipe(
+            recipe.id,
+            {
+                ingredient_id: amount - getattr(
+                    existing.get(ingredient_id), "amount", 0
+                )
+                for ingredient_id, amount in amounts.items()
+            }
+        )
+        removed_ids = [
+            row.id for ingredient_id, row in existing.items()
+            if ingredient_id not in amounts
         ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        if removed_ids:
+            RecipeIngredient.objects.filter(id__in=removed_ids).delete()
+        kept_rows = []
+        changed_rows = []
+        new_rows = []
+        for ingredient_data in ingredients:
+            row = existing.get(ingredient_data["id"])
+            if row is None:
+                new_rows.append(
+                    RecipeIngredient(
+                        ingredients=ingredient_data["ingredient"],
+                        recipe=recipe,
+                        amount=ingredient_data["amount"]
+                    )
+                )
+                continue
+            row.ingredients = ingredient_data["ingredient"]
+            if row.amount != ingredient_data["amount"]:
+                row.amount = ingredient_data["amount"]
+                changed_rows.append(row)
+            kept_rows.append(row)
+        if changed_rows:
+            RecipeIngredient.objects.bulk_update(changed_rows, ["amount"])
+        if new_rows:
+            RecipeIngredient.objects.bulk_create(new_rows)
+        recipe.saved_recipe_ingredients = (
+            sorted(kept_rows, key=lambda row: row.id) + new_rows
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context.get("request").user
         tags = validated_data.pop("tags")
@@ -305,6 +399,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self._update_tags_and_ingredients(recipe, tags, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
@@ -318,7 +413,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             {"id": tag.id, "name": tag.name, "slug": tag.slug}
             for tag in tags
         ]
-        ingredients = RecipeIngredient.objects.filter(recipe=instance)
+        ingredients = getattr(instance, "saved_recipe_ingredients", None)
+        if ingredients is None:
+            ingredients = instance.recipe_ingredient.select_related(
+                "ingredients"
+            )
         ingredients_data = [
             {
                 **IngredientSerializer(ingredient.ingredients).data,
@@ -335,33 +434,48 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart": data.get("is_in_shopping_cart"),
             "name": data.get("name"),
             "image": data.get("image"),
+            "image_thumbnail": data.get("image_thumbnail"),
             "text": data.get("text"),
             "cooking_time": int(data.get("cooking_time"))
         }
         return data
 
     def get_is_favorited(self, obj):
-        user = self.context.get("request").user
-        return Favorite.objects.filter(user=user, recipe=obj).exists()
+        return obj.id in get_membership(self.context).favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get("request").user
-        return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
+        return obj.id in get_membership(self.context).shopping_cart_ids
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """Список рецептов с общим обращением к кэшу представлений."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        return self.child.represent_many(recipes)
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
-    """Сериализатор для чтения рецептов."""
+    """Сериализатор для чтения рецептов.
+
+    Не зависящая от пользователя часть представления строится
+    без полей DRF (см. api.representations) и кэшируется по версии
+    рецепта, поля is_favorited, is_in_shopping_cart и
+    author.is_subscribed накладываются поверх для каждого запроса.
+    """
 
     tags = TagSerializer(many=True)
     author = UserSerializer(
         read_only=True,
     )
     ingredients = serializers.SerializerMethodField()
-    is_favorited = serializers.BooleanField()
-    is_in_shopping_cart = serializers.BooleanField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    image_thumbnail = ThumbnailField()
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeReadListSerializer
         fields = (
             "id",
             "tags",
@@ -371,16 +485,117 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_thumbnail",
             "text",
             "cooking_time",
         )
 
-    def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(recipe=obj)
-        return [
-            {
-                **IngredientSerializer(ingredient.ingredients).data,
-                "amount": ingredient.amount
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def represent_many(self, recipes):
+        public = self.public_representations(recipes)
+        return [self.overlay(recipe, public[recipe.id]) for recipe in recipes]
+
+    def get_shared_cache_key_parts(self):
+        """Общие для всех рецептов страницы части ключа кэша."""
+        request = self.context.get("request")
+        return (
+            get_version(TAGS),
+            get_version(INGREDIENTS),
+            request.get_host() if request is not None else "",
+        )
+
+    def get_cache_key(self, recipe, shared_parts):
+        author = recipe.author
+        parts = (
+            recipe.updated_at,
+            author.username,
+            author.first_name,
+            author.last_name,
+            author.email,
+            author.avatar,
+            *shared_parts,
+        )
+        digest = hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+        return f"recipe_repr:{recipe.id}:{digest}"
+
+    def public_representations(self, recipes):
+        """Представления без пользовательских полей: из кэша, а для
+        отсутствующих в кэше рецептов — с одной предзагрузкой."""
+        use_cache = settings.RECIPE_REPRESENTATION_CACHE
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        keys = {}
+        cached = {}
+        if use_cache:
+            shared_parts = self.get_shared_cache_key_parts()
+            keys = {
+                recipe.id: self.get_cache_key(recipe, shared_parts)
+                for recipe in recipes
             }
-            for ingredient in ingredients
-        ]
+            cached = cache.get_many(keys.values())
+        public = {}
+        missing = []
+        for recipe in recipes:
+            if keys.get(recipe.id) in cached:
+                public[recipe.id] = cached[keys[recipe.id]]
+            else:
+                missing.append(recipe)
+        prefetch_related_objects(
+            missing,
+            "tags",
+            Prefetch(
+                "recipe_ingredient",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredients"
+                )
+            )
+        )
+        request = self.context.get("request")
+        for recipe in missing:
+            public[recipe.id] = recipe_representation(recipe, request)
+        if use_cache and missing:
+            cache.set_many(
+                {keys[recipe.id]: public[recipe.id] for recipe in missing},
+                settings.RECIPE_REPRESENTATION_CACHE_TIMEOUT
+            )
+        return public
+
+    def overlay(self, recipe, data):
+        """Наложение полей, зависящих от пользователя запроса."""
+        data = data.copy()
+        data["author"] = data["author"].copy()
+        data["author"]["is_subscribed"] = self.get_author_is_subscribed(
+            recipe
+        )
+        data["is_favorited"] = self.get_is_favorited(recipe)
+        data["is_in_shopping_cart"] = self.get_is_in_shopping_cart(recipe)
+        return data
+
+    def get_membership_flag(self, recipe, annotation, ids_name, object_id):
+        value = getattr(recipe, annotation, None)
+        if value is not None:
+            return value
+        membership = get_membership(self.context)
+        if membership is None:
+            return False
+        return object_id in getattr(membership, ids_name)
+
+    def get_author_is_subscribed(self, obj):
+        return self.get_membership_flag(
+            obj, "author_is_subscribed", "subscribed_ids", obj.author_id
+        )
+
+    def get_is_favorited(self, obj):
+        return self.get_membership_flag(
+            obj, "is_favorited", "favorite_ids", obj.id
+        )
+
+    def get_is_in_shopping_cart(self, obj):
+        return self.get_membership_flag(
+            obj, "is_in_shopping_cart", "shopping_cart_ids", obj.id
+        )
+
+    def get_ingredients(self, obj):
+        """Ингредиенты из предзагруженного recipe_ingredient."""
+        return recipe_ingredients(obj)
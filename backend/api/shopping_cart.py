@@ -0,0 +1,113 @@
+import csv
+import io
+from pathlib import Path
+
+from recipe.models import ShoppingListItem
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from backend.constants import (SHOPPING_CART_CHUNK_SIZE,
+                               SHOPPING_CART_PDF_FONT_SIZE,
+                               SHOPPING_CART_PDF_LINE_HEIGHT,
+                               SHOPPING_CART_PDF_MARGIN)
+
+PDF_FONT_NAME = "DejaVuSans"
+PDF_FONT_PATH = Path(__file__).resolve().parent / "fonts" / "DejaVuSans.ttf"
+"""Шрифт с кириллицей, встраиваемый в PDF."""
+
+
+class Echo:
+    """Буфер, который возвращает записанную строку вместо хранения."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_ingredients(user):
+    """Суммарное количество ингредиентов из списка покупок."""
+    return (
+        ShoppingListItem.objects.filter(user=user, total_amount__gt=0)
+        .values(
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "total_amount",
+        )
+        .order_by("ingredient__name")
+        .iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    )
+
+
+def ingredient_line(ingredient):
+    return (
+        f"{ingredient['ingredient__name']} "
+        f"({ingredient['ingredient__measurement_unit']}): "
+        f"{ingredient['total_amount']}"
+    )
+
+
+def render_txt(ingredients):
+    """Построчная генерация списка покупок в текстовом формате."""
+    for ingredient in ingredients:
+        yield f"{ingredient_line(ingredient)}\n".encode("utf-8")
+
+
+def render_csv(ingredients):
+    """Построчная генерация списка покупок в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ("Ингредиент", "Единица измерения", "Количество")
+    ).encode("utf-8")
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient["ingredient__name"],
+            ingredient["ingredient__measurement_unit"],
+            ingredient["total_amount"],
+        )).encode("utf-8")
+
+
+def register_pdf_font():
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_PATH))
+
+
+def render_pdf(ingredients):
+    """Генерация списка покупок в формате PDF.
+
+    Строки читаются из базы потоком и раскладываются по страницам,
+    в памяти остаётся только сжатый документ. Таблица ссылок PDF
+    строится по всему файлу, поэтому он отдаётся после последней
+    страницы.
+    """
+    register_pdf_font()
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    pdf.setTitle("Список покупок")
+    width, height = A4
+    text_width = width - 2 * SHOPPING_CART_PDF_MARGIN
+    position = height - SHOPPING_CART_PDF_MARGIN
+    pdf.setFont(PDF_FONT_NAME, SHOPPING_CART_PDF_FONT_SIZE)
+    for ingredient in ingredients:
+        for line in simpleSplit(
+            ingredient_line(ingredient), PDF_FONT_NAME,
+            SHOPPING_CART_PDF_FONT_SIZE, text_width,
+        ):
+            if position < SHOPPING_CART_PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT_NAME, SHOPPING_CART_PDF_FONT_SIZE)
+                position = height - SHOPPING_CART_PDF_MARGIN
+            pdf.drawString(SHOPPING_CART_PDF_MARGIN, position, line)
+            position -= SHOPPING_CART_PDF_LINE_HEIGHT
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(io.DEFAULT_BUFFER_SIZE), b"")
+
+
+SHOPPING_CART_FORMATS = {
+    "txt": (render_txt, "text/plain"),
+    "csv": (render_csv, "text/csv"),
+    "pdf": (render_pdf, "application/pdf"),
+}
+"""Форматы файла списка покупок: генератор и content type."""
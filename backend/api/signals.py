@@ -0,0 +1,187 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+from recipe.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                           RecipeIngredient, ShoppingCart, ShoppingListItem,
+                           Tag)
+from users.models import Subscription, User
+
+from .representations import AUTHOR_PLAN
+from .versions import (INGREDIENTS, RECIPE_COUNT, RECIPE_LIST, TAGS,
+                       USER_RECIPE_COUNT, bump_version)
+
+
+COUNTERS = {
+    Recipe: (User, "author_id", "recipes_count"),
+    Subscription: (User, "subscribed_to_id", "subscribers_count"),
+    Favorite: (Recipe, "recipe_id", "favorites_count"),
+    ShoppingCart: (Recipe, "recipe_id", "carts_count"),
+}
+"""Денормализованные счётчики: модель, внешний ключ и поле счётчика."""
+
+AUTHOR_FIELDS = frozenset((*AUTHOR_PLAN.fields, "avatar"))
+"""Поля пользователя, которые выводятся в рецептах."""
+
+
+def change_counter(instance, delta):
+    """Атомарное изменение счётчика связанной записи через F()."""
+    model, field, counter = COUNTERS[type(instance)]
+    queryset = model.objects.filter(pk=getattr(instance, field))
+    if delta < 0:
+        queryset = queryset.filter(**{f"{counter}__gte": -delta})
+    queryset.update(**{counter: F(counter) + delta})
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def counted_object_saved(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def counted_object_deleted(sender, instance, **kwargs):
+    change_counter(instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    bump_version(RECIPE_LIST)
+    if created:
+        bump_version(RECIPE_COUNT)
+        transaction.on_commit(lambda: FeedEntry.objects.fan_out(instance))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_saved(sender, instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.follow(
+            instance.subscriber_id, instance.subscribed_to_id
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    FeedEntry.objects.unfollow(
+        instance.subscriber_id, instance.subscribed_to_id
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, **kwargs):
+    bump_version(RECIPE_LIST)
+    bump_version(RECIPE_COUNT)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_membership_changed(sender, instance, **kwargs):
+    """Меняются только выборки с фильтрами по избранному и списку
+    покупок этого пользователя."""
+    bump_version(USER_RECIPE_COUNT.format(instance.user_id))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    """Удаление из корзины, в том числе вместе с рецептом или
+    пользователем."""
+    ShoppingListItem.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, **kwargs):
+    """Прежние ингредиент и количество для пересчёта списков покупок."""
+    instance.previous_amount = None
+    if not instance._state.adding:
+        instance.previous_amount = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list("ingredients_id", "amount").first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    deltas = Counter({instance.ingredients_id: instance.amount})
+    previous_amount = getattr(instance, "previous_amount", None)
+    if previous_amount is not None:
+        ingredient_id, amount = previous_amount
+        deltas[ingredient_id] -= amount
+    ShoppingListItem.objects.change_recipe(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    """Удаление строки рецепта, в том числе вместе с рецептом: порядок
+    удаления строк и корзин не важен, каждый сигнал видит текущее
+    состояние другой таблицы."""
+    ShoppingListItem.objects.change_recipe(
+        instance.recipe_id, {instance.ingredients_id: -instance.amount}
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version(RECIPE_LIST)
+        bump_version(RECIPE_COUNT)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_content_changed(sender, instance, **kwargs):
+    """Изменение ингредиентов меняет версию рецепта для кэша
+    представлений и ETag."""
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now()
+    )
+    bump_version(RECIPE_LIST)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, created, update_fields, **kwargs):
+    """Сброс списков рецептов при изменении данных автора в них.
+
+    Сохранения других полей, например last_login при входе,
+    списки не меняют.
+    """
+    if created or (
+        update_fields is not None
+        and AUTHOR_FIELDS.isdisjoint(update_fields)
+    ):
+        return
+    bump_version(RECIPE_LIST)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_version(INGREDIENTS)
+    bump_version(RECIPE_LIST)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_version(TAGS)
+    bump_version(RECIPE_LIST)
@@ -3,7 +3,8 @@ from django.shortcuts import redirect
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet,
+                    metrics)
 
 
 def redirect_to_recipe(request, short_id):
@@ -22,4 +23,5 @@ urlpatterns = [
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
     path("r/<str:short_id>/", redirect_to_recipe, name="short_recipe_link"),
+    path("_metrics", metrics, name="metrics"),
 ]
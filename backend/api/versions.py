@@ -0,0 +1,45 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+RECIPE_COUNT = "recipe_count"
+"""Версия количества рецептов в выборках с фильтрами."""
+
+USER_RECIPE_COUNT = "recipe_count:user:{}"
+"""Версия количества рецептов в выборках пользователя: избранное
+и список покупок."""
+
+INGREDIENTS = "ingredients"
+"""Версия справочника ингредиентов."""
+
+TAGS = "tags"
+"""Версия справочника тегов."""
+
+RECIPE_LIST = "recipe_list"
+"""Версия закэшированных списков рецептов для анонимных пользователей."""
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def get_version(name):
+    """Текущая версия набора данных name для ключей кэша."""
+    return cache.get_or_set(_version_key(name), time.time_ns, timeout=None)
+
+
+def _increment_version(name):
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(name):
+    """Новая версия набора данных name, старые ключи кэша устаревают.
+
+    Внутри транзакции версия меняется после коммита, чтобы параллельный
+    запрос не закэшировал данные до их фиксации под новой версией.
+    """
+    transaction.on_commit(lambda: _increment_version(name))
@@ -1,8 +1,10 @@
-import io
-
 import short_url
-from django.db.models import BooleanField, Count, Exists, OuterRef, Sum, Value
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window, prefetch_related_objects)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
@@ -10,37 +12,111 @@ from djoser import views as djoser_views
 from recipe.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                            ShoppingCart, Tag)
 from rest_framework import status
-from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import (SAFE_METHODS, AllowAny,
+                                        IsAdminUser, IsAuthenticated)
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from users.models import Subscription, User
 
+from backend.constants import PAGE_SIZE, REFERENCE_CACHE_MAX_AGE
+
 from .filters import IngredientFilter, RecipeFilter
-from .paginators import PageAndLimitPagination
+from .ingredient_catalog import get_catalog
+from .membership import UserMembership
+from .metrics import render_prometheus
+from .mixins import (AnonymousListCacheMixin, ConditionalGetMixin,
+                     InstrumentedViewMixin)
+from .paginators import (FeedPagination, PageAndLimitPagination,
+                         PageLimitOrCursorPagination)
 from .permissions import IsAuthenticatedAuthorOrReadOnly
 from .serializers import (AvatarSerializer, FavoriteSerializer,
                           IngredientSerializer, RecipeIngredientSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
                           ShoppingCartSerializer, SubscriptionSerializer,
                           TagSerializer, UserSerializer)
+from .shopping_cart import SHOPPING_CART_FORMATS, shopping_cart_ingredients
+from .versions import INGREDIENTS, RECIPE_LIST, TAGS, get_version
+
+
+def limited_recipes_prefetch(author_ids, recipes_limit):
+    """Prefetch рецептов авторов не более recipes_limit на автора.
+
+    Ограничение применяется в SQL оконной функцией ROW_NUMBER()
+    сразу для всей страницы подписок.
+    """
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if recipes_limit:
+        ranked_sql, params = recipes.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=F("author_id"),
+                order_by=(F("created_at").desc(), F("id").desc()),
+            )
+        ).values("id", "recipe_rank").query.sql_with_params()
+        recipes = recipes.filter(
+            id__in=RawSQL(
+                f"SELECT ranked.id FROM ({ranked_sql}) ranked "
+                "WHERE ranked.recipe_rank <= %s",
+                (*params, recipes_limit)
+            )
+        )
+    return Prefetch(
+        "subscribed_to__recipes",
+        queryset=recipes,
+        to_attr="limited_recipes"
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Счётчики API в текстовом формате Prometheus."""
+    return HttpResponse(
+        render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
-class UserViewSet(djoser_views.UserViewSet):
+class UserViewSet(InstrumentedViewMixin, djoser_views.UserViewSet):
     """Вьюсет для модели Пользователя."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = PageAndLimitPagination
     permission_classes = [IsAuthenticatedAuthorOrReadOnly]
+    query_budgets = {
+        "list": 3,
+        "retrieve": 2,
+        "get_me": 1,
+        "show_subscriptions": 3,
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
+        context["membership"] = UserMembership.for_request(self.request)
         if "recipes_limit" in self.request.query_params:
             recipes_limit = int(self.request.query_params["recipes_limit"])
             context["recipes_limit"] = recipes_limit
         return context
 
+    def get_queryset(self):
+        """Аннотирование поля is_subscribed."""
+        user = self.request.user
+        queryset = super().get_queryset()
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscription.objects.filter(
+                    subscriber=user,
+                    subscribed_to=OuterRef("id")
+                )
+            )
+        )
+
     def get_permissions(self):
         if self.action == "get_me":
             return [IsAuthenticated()]
@@ -90,20 +166,31 @@ class UserViewSet(djoser_views.UserViewSet):
     def manage_subscriptions(self, request, id=None):
         user = request.user
         followee = get_object_or_404(User, id=id)
+        membership = UserMembership.for_request(request)
         if request.method == "POST":
             serializer = SubscriptionSerializer(
                 data={"subscriber": user.id, "subscribed_to": followee.id}
             )
             serializer.is_valid(raise_exception=True)
             subscription = serializer.save()
+            membership.invalidate()
             annotated_subscription = Subscription.objects.filter(
                 id=subscription.id
+            ).select_related(
+                "subscribed_to"
             ).annotate(
-                recipes_count=Count("subscribed_to__recipes")
+                is_subscribed=Value(True, output_field=BooleanField())
             ).first()
-            response_serializer = SubscriptionSerializer(
-                annotated_subscription,
-                context=self.get_serializer_context()
+            context = self.get_serializer_context()
+            prefetch_related_objects(
+                [annotated_subscription],
+                limited_recipes_prefetch(
+                    [followee.id],
+                    context.get("recipes_limit", PAGE_SIZE)
+                )
+            )
+            response_serializer = self.instrument_serializer(
+                SubscriptionSerializer(annotated_subscription, context=context)
             )
             return Response(
                 response_serializer.data,
@@ -114,6 +201,7 @@ class UserViewSet(djoser_views.UserViewSet):
                 subscriber=user,
                 subscribed_to=followee
             ).delete()
+            membership.invalidate()
             if deleted_count == 0:
                 return Response(
                     {"detail": "Вы уже отписались этого автора."},
@@ -135,38 +223,77 @@ class UserViewSet(djoser_views.UserViewSet):
         ).select_related(
             "subscribed_to"
         ).annotate(
-            recipes_count=Count("subscribed_to__recipes")
+            is_subscribed=Value(True, output_field=BooleanField())
         )
         paginator = self.pagination_class()
         paginated_subscriptions = paginator.paginate_queryset(
             subscriptions,
             request
         )
-        serializer = SubscriptionSerializer(
+        context = self.get_serializer_context()
+        prefetch_related_objects(
             paginated_subscriptions,
-            many=True,
-            context=self.get_serializer_context()
+            limited_recipes_prefetch(
+                [
+                    subscription.subscribed_to_id
+                    for subscription in paginated_subscriptions
+                ],
+                context.get("recipes_limit", PAGE_SIZE)
+            )
+        )
+        serializer = self.instrument_serializer(
+            SubscriptionSerializer(
+                paginated_subscriptions,
+                many=True,
+                context=context
+            )
         )
         return paginator.get_paginated_response(serializer.data)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    InstrumentedViewMixin, ConditionalGetMixin, ReadOnlyModelViewSet
+):
     """Вьюсет для модели Tag."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    query_budgets = {"list": 1, "retrieve": 1}
     permission_classes = [AllowAny]
     filter_backends = (DjangoFilterBackend,)
+    cache_control = {"public": True, "max_age": REFERENCE_CACHE_MAX_AGE}
+
+    def get_etag_parts(self, request):
+        return (get_version(TAGS),)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    InstrumentedViewMixin, ConditionalGetMixin, ReadOnlyModelViewSet
+):
     """Вьюсет для модели Ingredient."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    query_budgets = {"list": 1, "retrieve": 1}
     permission_classes = [AllowAny]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+    cache_control = {"public": True, "max_age": REFERENCE_CACHE_MAX_AGE}
+
+    def get_etag_parts(self, request):
+        return (get_version(INGREDIENTS),)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.catalog_list)
+
+    def catalog_list(self, request):
+        """Список и автодополнение из справочника в памяти, без запросов
+        к базе."""
+        catalog = get_catalog()
+        name = request.query_params.get("name")
+        if name:
+            return Response(catalog.search(name))
+        return Response(catalog.by_id)
 
 
 def manage_recipe_action(
@@ -175,6 +302,7 @@ def manage_recipe_action(
 ):
     """Добавление/удаление рецепта в избранное или корзину."""
     recipe = get_object_or_404(Recipe, id=recipe_id)
+    membership = UserMembership.for_request(request)
 
     if request.method == "POST":
         if model.objects.filter(user=user, recipe=recipe).exists():
@@ -184,15 +312,19 @@ def manage_recipe_action(
             )
         serializer = serializer_class(
             data={"recipe": recipe.id},
-            context={"request": request}
+            context={"request": request, "membership": membership}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=user)
+        with transaction.atomic():
+            serializer.save(user=user)
+        membership.invalidate()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     if request.method == "DELETE":
-        deleted_count, _ = model.objects.filter(
-            user=user, recipe=recipe
-        ).delete()
+        with transaction.atomic():
+            deleted_count, _ = model.objects.filter(
+                user=user, recipe=recipe
+            ).delete()
+        membership.invalidate()
         if deleted_count == 0:
             return Response(
                 {"detail": delete_message},
@@ -201,50 +333,90 @@ def manage_recipe_action(
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(
+    InstrumentedViewMixin,
+    AnonymousListCacheMixin,
+    ConditionalGetMixin,
+    ModelViewSet
+):
     """Вьюсет для модели Recipe."""
 
-    queryset = Recipe.objects.select_related(
-        'author'
-    ).prefetch_related(
-        'tags', 'ingredients')
+    queryset = Recipe.objects.select_related('author')
     serializer_class = (RecipeReadSerializer, RecipeWriteSerializer,)
     permission_classes = [IsAuthenticatedAuthorOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = PageAndLimitPagination
+    pagination_class = PageLimitOrCursorPagination
+    cache_version = RECIPE_LIST
+    cache_query_params = ("page", "limit", "tags", "author", "cursor")
+    cache_query_defaults = {"page": 1, "limit": PAGE_SIZE}
+    query_budgets = {
+        "list": 6,
+        "retrieve": 4,
+        "feed": 7,
+        "download_shopping_cart": 2,
+        "get_link": 1,
+    }
 
     def get_queryset(self):
-        """Аннотирование полей is_favorited и is_in_shopping_cart."""
+        """Аннотирование полей is_favorited, is_in_shopping_cart и
+        подписки на автора рецепта."""
         user = self.request.user
         queryset = self.queryset
         if not user.is_authenticated:
             return queryset.annotate(
                 is_favorited=Value(False, output_field=BooleanField()),
-                is_in_shopping_cart=Value(False, output_field=BooleanField())
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField())
             )
-        recipe_ids_subquery = Recipe.objects.values_list('id', flat=True)
-        favorites_subquery = Favorite.objects.filter(
-            user=user,
-            recipe_id__in=recipe_ids_subquery
-        )
-        shopping_cart_subquery = ShoppingCart.objects.filter(
-            user=user,
-            recipe_id__in=recipe_ids_subquery
-        )
-
         return queryset.annotate(
             is_favorited=Exists(
-                favorites_subquery.filter(
-                    recipe_id=OuterRef('id')
-                )
+                Favorite.objects.filter(user=user, recipe_id=OuterRef('id'))
             ),
             is_in_shopping_cart=Exists(
-                shopping_cart_subquery.filter(
-                    recipe_id=OuterRef('id')
+                ShoppingCart.objects.filter(
+                    user=user, recipe_id=OuterRef('id')
+                )
+            ),
+            author_is_subscribed=Exists(
+                Subscription.objects.filter(
+                    subscriber=user,
+                    subscribed_to=OuterRef('author')
                 )
             )
-        ).distinct()
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["membership"] = UserMembership.for_request(self.request)
+        return context
+
+    def get_etag_parts(self, request):
+        """ETag рецепта для анонимных пользователей: изменение рецепта,
+        данных автора и справочников."""
+        if self.action != "retrieve" or request.user.is_authenticated:
+            return None
+        try:
+            self.etag_row = Recipe.objects.filter(
+                pk=self.kwargs["pk"]
+            ).values_list(
+                "updated_at",
+                "author__username",
+                "author__first_name",
+                "author__last_name",
+                "author__email",
+                "author__avatar",
+            ).first()
+        except (TypeError, ValueError):
+            return None
+        if self.etag_row is None:
+            return None
+        return (
+            *self.etag_row, get_version(TAGS), get_version(INGREDIENTS)
+        )
+
+    def get_last_modified(self, request):
+        return self.etag_row[0]
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -284,22 +456,12 @@ class RecipeViewSet(ModelViewSet):
             delete_message="Этого рецепта не было в списке покупок."
         )
 
-    @staticmethod
-    def generate_shopping_cart_file(ingredients):
-        """Генерация содержимое файла для списка покупок."""
-        buffer = io.BytesIO()
-        for ingredient in ingredients:
-            name_measurement_unit = (
-                f"{ingredient['ingredients__name']} "
-                f"({ingredient['ingredients__measurement_unit']})"
-            )
-            buffer.write(
-                (
-                    f"{name_measurement_unit}: {ingredient['total_amount']}\n"
-                ).encode('utf-8')
-            )
-        buffer.seek(0)
-        return buffer
+    def perform_content_negotiation(self, request, force=False):
+        """Параметр format выбирает формат файла списка покупок,
+        а не рендерер DRF."""
+        if self.action == "download_shopping_cart":
+            force = True
+        return super().perform_content_negotiation(request, force)
 
     @action(
         ["get"],
@@ -309,29 +471,43 @@ class RecipeViewSet(ModelViewSet):
     )
     def download_shopping_cart(self, request):
         user = request.user
+        file_format = request.query_params.get("format", "txt")
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                {"detail": "Неподдерживаемый формат списка покупок."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         if not ShoppingCart.objects.filter(user=user).exists():
             return Response(
                 {"detail": "Список покупок пуст."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__recipe_shoppingcart_related__user=user
-            )
-            .values(
-                "ingredients__name",
-                "ingredients__measurement_unit",
-            ).annotate(total_amount=Sum("amount"))
-        )
-        file_content = self.generate_shopping_cart_file(ingredients)
-        return HttpResponse(
-            file_content.getvalue(),
-            content_type="text/plain",
+        render, content_type = SHOPPING_CART_FORMATS[file_format]
+        return StreamingHttpResponse(
+            render(shopping_cart_ingredients(user)),
+            content_type=content_type,
             headers={
-                "Content-Disposition": "attachment; filename=shopping_cart.txt"
+                "Content-Disposition": (
+                    f"attachment; filename=shopping_cart.{file_format}"
+                )
             }
         )
 
+    @action(
+        ["get"],
+        detail=False,
+        url_path="feed",
+        url_name="feed",
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         ["get"],
         detail=True,
@@ -349,7 +525,7 @@ class RecipeViewSet(ModelViewSet):
         return Response({"short-link": short_link})
 
 
-class RecipeIngredientViewSet(ModelViewSet):
+class RecipeIngredientViewSet(InstrumentedViewMixin, ModelViewSet):
     """Вьюсет для модели RecipeIngredient."""
 
     queryset = RecipeIngredient.objects.all()
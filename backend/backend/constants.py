@@ -18,3 +18,36 @@ MAX_LEN_RECIPE_NAME = 256
 
 PAGE_SIZE = 6
 """Определяет количество объектов на странице."""
+
+SHOPPING_CART_CHUNK_SIZE = 500
+"""Количество строк списка покупок, загружаемых из базы за один раз."""
+
+SHOPPING_CART_PDF_FONT_SIZE = 12
+"""Размер шрифта в PDF-файле списка покупок."""
+
+SHOPPING_CART_PDF_LINE_HEIGHT = 18
+"""Расстояние между строками в PDF-файле списка покупок."""
+
+SHOPPING_CART_PDF_MARGIN = 50
+"""Поля страницы PDF-файла списка покупок."""
+
+THUMBNAIL_SIZES = {
+    "list": (480, 480),
+    "detail": (1024, 1024),
+}
+"""Максимальные размеры превью картинок рецептов."""
+
+THUMBNAIL_QUALITY = 85
+"""Качество сжатия превью картинок рецептов."""
+
+IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+"""Форматы загружаемых картинок, которые Pillow умеет сохранять."""
+
+REFERENCE_CACHE_MAX_AGE = 300
+"""Время кэширования справочников тегов и ингредиентов клиентом, в секундах."""
+
+FEED_FANOUT_BATCH_SIZE = 1000
+"""Количество записей ленты подписок, вставляемых за один запрос."""
+
+SHOPPING_LIST_BATCH_SIZE = 1000
+"""Количество позиций списков покупок, изменяемых за один запрос."""
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "django_filters",
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -71,6 +73,14 @@ DATABASES = {
     }
 }
 
+if os.getenv("DB_ENGINE") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+
 AUTH_USER_MODEL = "users.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -129,3 +139,42 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / ".." / "media_files"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_MAX_CONCURRENCY = int(os.getenv("IMAGE_MAX_CONCURRENCY", 4))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", 10))
+IMAGE_MAX_SIZE = int(os.getenv("IMAGE_MAX_SIZE", 10 * 1024 * 1024))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", str(BASE_DIR / ".." / "cache_files")
+        ),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = "default"
+# Метрикам нужен кэш с атомарными add и incr (Redis, Memcached),
+# с FileBasedCache приращения из разных воркеров теряются.
+METRICS_CACHE_ALIAS = os.getenv("METRICS_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+RECIPE_REPRESENTATION_CACHE = os.getenv(
+    "RECIPE_REPRESENTATION_CACHE", "true"
+).lower() == "true"
+RECIPE_REPRESENTATION_CACHE_TIMEOUT = int(
+    os.getenv("RECIPE_REPRESENTATION_CACHE_TIMEOUT", 3600)
+)
+
+COUNT_CACHE_TIMEOUT = int(os.getenv("COUNT_CACHE_TIMEOUT", 30))
+APPROXIMATE_COUNT_THRESHOLD = int(
+    os.getenv("APPROXIMATE_COUNT_THRESHOLD", 100000)
+)
+FEED_PULL_THRESHOLD = int(os.getenv("FEED_PULL_THRESHOLD", 1000))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+QUERY_BUDGET_STRICT = os.getenv(
+    "QUERY_BUDGET_STRICT", "false"
+).lower() == "true"
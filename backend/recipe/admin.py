@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, Tag)
 
 
 @admin.register(Tag)
@@ -21,12 +21,12 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("pk", "name", "author")
+    list_display = ("pk", "name", "author", "favorites_count")
     list_display_links = ("name",)
     search_fields = ("name",)
     list_filter = ("name", "author", "tags",)
     empty_value_display = "-пусто-"
-    readonly_fields = ("favorites_count",)
+    readonly_fields = ("favorites_count", "carts_count")
 
     def get_queryset(self, request):
         """Оптимизация запроса для списка рецептов."""
@@ -37,11 +37,6 @@ class RecipeAdmin(admin.ModelAdmin):
             "tags", "ingredients"
         )
 
-    @admin.display(description="Количество в избранном")
-    def favorites_count(self, obj):
-        """Возвращает количество рецептов, добавленных в избранное"""
-        return obj.favorites.count()
-
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
@@ -77,3 +72,16 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         """Оптимизация запроса для корзины покупок."""
         queryset = super().get_queryset(request)
         return queryset.select_related("user", "recipe")
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "ingredient", "total_amount")
+    list_display_links = ("user",)
+    search_fields = ("user__username", "user__email", "ingredient__name")
+    empty_value_display = "-пусто-"
+
+    def get_queryset(self, request):
+        """Оптимизация запроса для списков покупок."""
+        queryset = super().get_queryset(request)
+        return queryset.select_related("user", "ingredient")
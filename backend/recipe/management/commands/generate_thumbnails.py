@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from recipe.models import Recipe
+from recipe.thumbnails import create_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Создаёт превью для уже загруженных картинок рецептов."
+
+    def handle(self, *args, **options):
+        count = 0
+        recipes = Recipe.objects.exclude(image="").exclude(image__isnull=True)
+        for recipe in recipes.only("id", "image").iterator():
+            try:
+                create_thumbnails(recipe.image)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f"Рецепт {recipe.id}: {error}")
+                continue
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Создано превью: {count}"))
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+from api.versions import INGREDIENTS, RECIPE_LIST, bump_version
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipe.models import Ingredient
+
+DEFAULT_PATH = settings.BASE_DIR.parent / "data" / "ingredients.csv"
+BATCH_SIZE = 1000
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as file:
+        for item in json.load(file):
+            yield item["name"], item["measurement_unit"]
+
+
+READERS = {".csv": read_csv, ".json": read_json}
+
+
+class Command(BaseCommand):
+    help = "Загружает справочник ингредиентов из CSV или JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=str(DEFAULT_PATH),
+            help="Путь к ingredients.csv или ingredients.json.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Показать изменения без записи в базу.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError("Поддерживаются только файлы .csv и .json")
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден")
+        existing = dict(
+            Ingredient.objects.values_list("name", "measurement_unit")
+        )
+        new_rows = {}
+        changed = {}
+        seen = set()
+        unchanged = duplicates = 0
+        for name, measurement_unit in reader(path):
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+            if not name:
+                continue
+            if name in seen:
+                duplicates += 1
+                continue
+            seen.add(name)
+            if name not in existing:
+                new_rows[name] = measurement_unit
+            elif existing[name] != measurement_unit:
+                changed[name] = measurement_unit
+            else:
+                unchanged += 1
+        self.stdout.write(
+            f"Новых: {len(new_rows)}, изменённых: {len(changed)}, "
+            f"без изменений: {unchanged}, повторов в файле: {duplicates}"
+        )
+        for name, measurement_unit in changed.items():
+            self.stdout.write(
+                f"  {name}: {existing[name]} -> {measurement_unit}"
+            )
+        if options["dry_run"] or not (new_rows or changed):
+            return
+        with transaction.atomic():
+            self.insert(new_rows)
+            self.update(changed)
+        # Единицы измерения входят в закэшированные списки рецептов.
+        bump_version(INGREDIENTS)
+        bump_version(RECIPE_LIST)
+        self.stdout.write(self.style.SUCCESS("Ингредиенты загружены"))
+
+    @staticmethod
+    def insert(rows):
+        """Вставка через COPY в Postgres, иначе через bulk_create."""
+        if not rows:
+            return
+        if connection.vendor == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows.items())
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {Ingredient._meta.db_table} "
+                    "(name, measurement_unit) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            return
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in rows.items()
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def update(rows):
+        if not rows:
+            return
+        ingredients = list(Ingredient.objects.filter(name__in=rows))
+        for ingredient in ingredients:
+            ingredient.measurement_unit = rows[ingredient.name]
+        Ingredient.objects.bulk_update(
+            ingredients, ["measurement_unit"], batch_size=BATCH_SIZE
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipe.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает или проверяет агрегированные списки покупок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Только сравнить агрегат с пересчётом, не изменяя данные.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            count = ShoppingListItem.objects.rebuild()
+            self.stdout.write(
+                self.style.SUCCESS(f"Пересчитано позиций: {count}")
+            )
+            return
+        expected = ShoppingListItem.objects.expected_totals()
+        actual = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingListItem.objects.values_list(
+                "user_id", "ingredient_id", "total_amount"
+            )
+        }
+        mismatches = [
+            (key, actual.get(key), expected.get(key))
+            for key in expected.keys() | actual.keys()
+            if actual.get(key) != expected.get(key)
+        ]
+        for (user_id, ingredient_id), stored, computed in sorted(
+            mismatches, key=lambda mismatch: mismatch[0]
+        ):
+            self.stdout.write(
+                f"user={user_id} ingredient={ingredient_id}: "
+                f"{stored} != {computed}"
+            )
+        if mismatches:
+            raise CommandError(f"Расхождений: {len(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("Расхождений нет"))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipe.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+BATCH_SIZE = 1000
+
+COUNTERS = (
+    (User, "recipes_count", Recipe, "author"),
+    (User, "subscribers_count", Subscription, "subscribed_to"),
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "carts_count", ShoppingCart, "recipe"),
+)
+
+
+def actual_count(related, field):
+    """Подзапрос с фактическим количеством связанных записей."""
+    return Coalesce(
+        Subquery(
+            related.objects.filter(**{field: OuterRef("pk")})
+            .order_by().values(field)
+            .annotate(total=Count("pk")).values("total")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Сверяет и исправляет денормализованные счётчики."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Показать расхождения без записи в базу.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, counter, related, field in COUNTERS:
+            with transaction.atomic():
+                drifted = [
+                    model(pk=pk, **{counter: actual})
+                    for pk, actual in model.objects.annotate(
+                        actual=actual_count(related, field)
+                    ).exclude(
+                        **{counter: F("actual")}
+                    ).values_list("pk", "actual")
+                ]
+                if drifted and not options["dry_run"]:
+                    model.objects.bulk_update(
+                        drifted, [counter], batch_size=BATCH_SIZE
+                    )
+            total += len(drifted)
+            self.stdout.write(
+                f"{model._meta.model_name}.{counter}: "
+                f"расхождений {len(drifted)}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Всего расхождений: {total}"))
@@ -0,0 +1,69 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import DatabaseError, migrations, models, transaction
+from django.db.models.functions import Lower
+
+PREFIX_INDEX = models.Index(
+    OpClass(Lower('name'), name='text_pattern_ops'),
+    name='ingredient_name_prefix_idx',
+)
+"""Индекс поиска ингредиентов по началу lower(name), LIKE 'x%'."""
+
+TRIGRAM_INDEX = GinIndex(
+    OpClass(Lower('name'), name='gin_trgm_ops'),
+    name='ingredient_name_trgm_idx',
+)
+"""Индекс поиска ингредиентов по подстроке lower(name), LIKE '%x%'.
+
+Создаётся, только если расширение pg_trgm доступно и роль может его
+установить. Классы операторов есть только в Postgres, поэтому индексы
+не входят в состояние модели.
+"""
+
+
+def create_trigram_extension(schema_editor):
+    """Установка pg_trgm; False, если расширения нет или не хватает прав."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT installed_version IS NOT NULL "
+            "FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    if row[0]:
+        return True
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ingredient = apps.get_model('recipe', 'Ingredient')
+    schema_editor.add_index(ingredient, PREFIX_INDEX)
+    if create_trigram_extension(schema_editor):
+        schema_editor.add_index(ingredient, TRIGRAM_INDEX)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index in (TRIGRAM_INDEX, PREFIX_INDEX):
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_recipe_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
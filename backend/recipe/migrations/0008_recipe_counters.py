@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-17 04:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('users', 'User', 'recipes_count', 'recipe', 'Recipe', 'author'),
+    ('users', 'User', 'subscribers_count',
+     'users', 'Subscription', 'subscribed_to'),
+    ('recipe', 'Recipe', 'favorites_count', 'recipe', 'Favorite', 'recipe'),
+    ('recipe', 'Recipe', 'carts_count', 'recipe', 'ShoppingCart', 'recipe'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model, counter, related_app, related, field in COUNTERS:
+        related_objects = apps.get_model(related_app, related).objects
+        apps.get_model(app, model).objects.update(**{
+            counter: Coalesce(
+                Subquery(
+                    related_objects.filter(**{field: OuterRef('pk')})
+                    .order_by().values(field)
+                    .annotate(total=Count('pk')).values('total')
+                ),
+                0,
+            )
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_updated_at'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
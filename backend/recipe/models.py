@@ -1,10 +1,17 @@
+import heapq
+from itertools import groupby, islice
+
+from api.images import generate_thumbnails
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from users.models import User
+from django.db import connections, models, transaction
+from django.db.models import F, Sum
+from users.models import Subscription, User
 
-from backend.constants import (MAX_LEN_INGREDIENT_NAME,
+from backend.constants import (FEED_FANOUT_BATCH_SIZE,
+                               MAX_LEN_INGREDIENT_NAME,
                                MAX_LEN_MEASURMENT_UNIT, MAX_LEN_RECIPE_NAME,
-                               MAX_LEN_TAG_NAME)
+                               MAX_LEN_TAG_NAME, SHOPPING_LIST_BATCH_SIZE)
 
 
 class Tag(models.Model):
@@ -53,6 +60,8 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Модель для рецептов."""
 
+    COUNTER_FIELDS = ("favorites_count", "carts_count")
+
     tags = models.ManyToManyField(
         Tag,
         related_name="recipes",
@@ -92,15 +101,58 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name="Дата публикации",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+    favorites_count = models.PositiveIntegerField(
+        "Количество в избранном",
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        "Количество в списках покупок",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="recipe_created_at_id_idx"
+            ),
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="recipe_author_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Создание превью в пуле api.images после коммита загрузки
+        новой картинки.
+
+        Счётчики меняются только через F(), при обновлении рецепта
+        они не перезаписываются.
+        """
+        image_uploaded = bool(self.image) and not self.image._committed
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        if image_uploaded:
+            image = self.image
+            transaction.on_commit(lambda: generate_thumbnails(image))
+
 
 class RecipeIngredient(models.Model):
     """Модель соединяющая модель рецептов и ингредиентов."""
@@ -168,6 +220,12 @@ class Favorite(FavoriteShoppingCartFields):
     class Meta:
         verbose_name = "избранное"
         verbose_name_plural = "Избранное"
+        indexes = [
+            models.Index(
+                fields=["user", "recipe"],
+                name="favorite_user_recipe_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.recipe} в избранном {self.user}"
@@ -179,6 +237,351 @@ class ShoppingCart(FavoriteShoppingCartFields):
     class Meta:
         verbose_name = "список покупок"
         verbose_name_plural = "Списки покупок"
+        indexes = [
+            models.Index(
+                fields=["user", "recipe"],
+                name="shoppingcart_user_recipe_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.recipe} в списке покупок {self.user}"
+
+
+class ShoppingListItemManager(models.Manager):
+    """Инкрементальное обновление агрегированного списка покупок."""
+
+    @staticmethod
+    def recipe_amounts(recipe_id):
+        """Количество каждого ингредиента рецепта."""
+        return dict(
+            RecipeIngredient.objects.filter(
+                recipe_id=recipe_id
+            ).values_list("ingredients_id", "amount")
+        )
+
+    def upsert(self, rows):
+        """Прибавляет количество к позициям (user_id, ingredient_id,
+        количество) одним INSERT ... ON CONFLICT DO UPDATE на пачку.
+
+        Синтаксис одинаков для Postgres и SQLite, параллельные запросы
+        не конфликтуют на unique_shopping_list_item.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, SHOPPING_LIST_BATCH_SIZE)):
+                values = ", ".join(["(%s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    f"({quote_name('user_id')}, "
+                    f"{quote_name('ingredient_id')}, "
+                    f"{quote_name('total_amount')}) "
+                    f"VALUES {values} "
+                    f"ON CONFLICT ({quote_name('user_id')}, "
+                    f"{quote_name('ingredient_id')}) "
+                    f"DO UPDATE SET {quote_name('total_amount')} = "
+                    f"{table}.{quote_name('total_amount')} "
+                    f"+ EXCLUDED.{quote_name('total_amount')}",
+                    [value for row in batch for value in row]
+                )
+
+    def apply_deltas(self, user_ids, deltas):
+        """Прибавляет deltas {ingredient_id: количество} к спискам
+        покупок пользователей user_ids."""
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        user_ids = list(user_ids)
+        if not deltas or not user_ids:
+            return
+        with transaction.atomic(using=self.db):
+            self.upsert(
+                (user_id, ingredient_id, delta)
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+            )
+            if any(delta < 0 for delta in deltas.values()):
+                self.filter(
+                    user_id__in=user_ids, total_amount__lte=0
+                ).delete()
+
+    def add_recipe(self, user_ids, recipe_id):
+        self.apply_deltas(user_ids, self.recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.apply_deltas(
+            user_ids,
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount
+                in self.recipe_amounts(recipe_id).items()
+            }
+        )
+
+    def change_recipe(self, recipe_id, deltas):
+        """Изменение ингредиентов рецепта в списках покупок всех
+        пользователей, добавивших его в корзину."""
+        self.apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list("user_id", flat=True),
+            deltas
+        )
+
+    def expected_totals(self, user_ids=None):
+        """Агрегат, пересчитанный по рецептам в списках покупок."""
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__recipe_shoppingcart_related__isnull=False
+        )
+        if user_ids is not None:
+            ingredients = ingredients.filter(
+                recipe__recipe_shoppingcart_related__user_id__in=user_ids
+            )
+        return {
+            (row["user_id"], row["ingredients_id"]): row["total_amount"]
+            for row in ingredients.values(
+                "ingredients_id",
+                user_id=F("recipe__recipe_shoppingcart_related__user_id"),
+            ).annotate(total_amount=Sum("amount")).order_by()
+        }
+
+    def rebuild(self, user_ids=None):
+        """Полный пересчёт агрегата для всех или указанных пользователей."""
+        totals = self.expected_totals(user_ids)
+        with transaction.atomic():
+            items = self.all()
+            if user_ids is not None:
+                items = items.filter(user_id__in=user_ids)
+            items.delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount,
+                    )
+                    for (user_id, ingredient_id), total_amount
+                    in totals.items()
+                ),
+                batch_size=SHOPPING_LIST_BATCH_SIZE,
+            )
+        return len(totals)
+
+
+class ShoppingListItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Поддерживается при изменении списка покупок и ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list_items",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_list_items",
+        verbose_name="Ингредиент",
+    )
+    total_amount = models.IntegerField(
+        "Количество",
+        default=0,
+    )
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = "позиция списка покупок"
+        verbose_name_plural = "Позиции списков покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_list_item"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} для {self.user}: {self.total_amount}"
+
+
+class FeedEntryManager(models.Manager):
+    """Лента рецептов авторов, на которых подписан пользователь.
+
+    Рецепты авторов с числом подписчиков меньше FEED_PULL_THRESHOLD
+    раскладываются по лентам подписчиков при публикации, рецепты
+    популярных авторов выбираются при чтении ленты.
+    """
+
+    @staticmethod
+    def subscribers_count(author_id):
+        return User.objects.filter(
+            pk=author_id
+        ).values_list("subscribers_count", flat=True).first() or 0
+
+    def is_pushed(self, author_id):
+        """Раскладывать ли рецепты автора по лентам подписчиков."""
+        return (
+            self.subscribers_count(author_id) < settings.FEED_PULL_THRESHOLD
+        )
+
+    def insert(self, entries):
+        """Вставка записей ленты пачками по FEED_FANOUT_BATCH_SIZE."""
+        entries = iter(entries)
+        while batch := list(islice(entries, FEED_FANOUT_BATCH_SIZE)):
+            self.bulk_create(batch, ignore_conflicts=True)
+
+    def fan_out(self, recipe):
+        """Добавление нового рецепта в ленты подписчиков автора."""
+        if not self.is_pushed(recipe.author_id):
+            return
+        subscriber_ids = Subscription.objects.filter(
+            subscribed_to_id=recipe.author_id
+        ).order_by().values_list("subscriber_id", flat=True)
+        self.insert(
+            self.model(
+                user_id=subscriber_id,
+                recipe_id=recipe.id,
+                created_at=recipe.created_at,
+            )
+            for subscriber_id
+            in subscriber_ids.iterator(chunk_size=FEED_FANOUT_BATCH_SIZE)
+        )
+
+    def add_author_recipes(self, user_id, author_id):
+        recipes = Recipe.objects.filter(
+            author_id=author_id
+        ).order_by().values_list("id", "created_at")
+        self.insert(
+            self.model(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                created_at=created_at,
+            )
+            for recipe_id, created_at
+            in recipes.iterator(chunk_size=FEED_FANOUT_BATCH_SIZE)
+        )
+
+    def follow(self, user_id, author_id):
+        """Добавление рецептов автора в ленту нового подписчика."""
+        if self.is_pushed(author_id):
+            self.add_author_recipes(user_id, author_id)
+
+    def unfollow(self, user_id, author_id):
+        """Удаление рецептов автора из ленты бывшего подписчика.
+
+        Когда автор опускается ниже порога, его рецепты раскладываются
+        по лентам оставшихся подписчиков.
+        """
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+        if (
+            self.subscribers_count(author_id)
+            != settings.FEED_PULL_THRESHOLD - 1
+        ):
+            return
+        for subscriber_id in Subscription.objects.filter(
+            subscribed_to_id=author_id
+        ).values_list("subscriber_id", flat=True):
+            self.add_author_recipes(subscriber_id, author_id)
+
+    @staticmethod
+    def pulled_author_ids(user):
+        """Авторы подписок, рецепты которых выбираются при чтении."""
+        return list(
+            Subscription.objects.filter(
+                subscriber=user,
+                subscribed_to__subscribers_count__gte=(
+                    settings.FEED_PULL_THRESHOLD
+                ),
+            ).values_list("subscribed_to_id", flat=True)
+        )
+
+    def page(self, user, size, before=None, recipes=None):
+        """Не больше size пар (created_at, recipe_id) ленты пользователя
+        по убыванию, начиная после позиции before.
+
+        Записи ленты читаются по индексу feed_user_created_idx, рецепты
+        популярных авторов — отдельным запросом; обе выборки ограничены
+        size строками и сливаются. recipes ограничивает ленту
+        отфильтрованными рецептами.
+        """
+        entries = self.filter(user=user)
+        if recipes is not None:
+            entries = entries.filter(recipe__in=recipes.values("id"))
+        if before is not None:
+            created_at, recipe_id = before
+            entries = entries.filter(
+                models.Q(created_at__lt=created_at)
+                | models.Q(created_at=created_at, recipe_id__lt=recipe_id)
+            )
+        sources = [
+            entries.order_by("-created_at", "-recipe").values_list(
+                "created_at", "recipe_id"
+            )[:size]
+        ]
+        author_ids = self.pulled_author_ids(user)
+        if author_ids:
+            pulled = (
+                recipes if recipes is not None else Recipe.objects.all()
+            ).filter(author_id__in=author_ids)
+            if before is not None:
+                pulled = pulled.filter(
+                    models.Q(created_at__lt=created_at)
+                    | models.Q(created_at=created_at, id__lt=recipe_id)
+                )
+            sources.append(
+                pulled.order_by("-created_at", "-id").values_list(
+                    "created_at", "id"
+                )[:size]
+            )
+        # Рецепты автора, перешедшего порог, могут остаться в записях
+        # ленты: одинаковые пары при слиянии идут подряд.
+        rows = (
+            row for row, _ in groupby(heapq.merge(*sources, reverse=True))
+        )
+        return list(islice(rows, size))
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    created_at = models.DateTimeField("Дата публикации")
+
+    objects = FeedEntryManager()
+
+    class Meta:
+        verbose_name = "запись ленты"
+        verbose_name_plural = "Ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-recipe"],
+                name="feed_user_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
@@ -0,0 +1,54 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+from backend.constants import THUMBNAIL_QUALITY, THUMBNAIL_SIZES
+
+if features.check("webp"):
+    THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = "WEBP", "webp"
+else:
+    THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = "JPEG", "jpg"
+
+
+def thumbnail_name(name, size):
+    """Имя файла превью рядом с оригинальной картинкой."""
+    root, _ = os.path.splitext(name)
+    return f"{root}_{size}.{THUMBNAIL_EXTENSION}"
+
+
+def create_thumbnails(image):
+    """Создание превью всех размеров для картинки рецепта."""
+    render_thumbnails(image.storage, image.name)
+
+
+def render_thumbnails(storage, name):
+    """Превью картинки name из storage.
+
+    Принимает хранилище и имя файла, а не FieldFile, чтобы выполняться
+    в процессе пула api.images.
+    """
+    with storage.open(name, "rb") as image_file:
+        original = Image.open(image_file)
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA")
+    if THUMBNAIL_FORMAT == "JPEG":
+        original = original.convert("RGB")
+    for size, dimensions in THUMBNAIL_SIZES.items():
+        thumbnail = original.copy()
+        thumbnail.thumbnail(dimensions)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+        thumbnail_path = thumbnail_name(name, size)
+        storage.delete(thumbnail_path)
+        storage.save(thumbnail_path, ContentFile(buffer.getvalue()))
+
+
+def thumbnail_urls(image):
+    """Адреса превью картинки рецепта по размерам."""
+    return {
+        size: image.storage.url(thumbnail_name(image.name, size))
+        for size in THUMBNAIL_SIZES
+    }
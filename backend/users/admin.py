@@ -14,6 +14,8 @@ class CustomUserAdmin(UserAdmin):
         "first_name",
         "last_name",
         "avatar",
+        "recipes_count",
+        "subscribers_count",
         'is_superuser',
         'is_active',
     )
@@ -8,6 +8,7 @@ from backend.constants import MAX_LEN_EMAIL, MAX_LEN_USER_INFO
 class User(AbstractUser):
     """Кастомная модель пользователя."""
 
+    COUNTER_FIELDS = ("recipes_count", "subscribers_count")
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = (
         "username",
@@ -45,6 +46,16 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов",
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        "Количество подписчиков",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "Пользователь"
@@ -53,6 +64,17 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        """Счётчики меняются только через F(), при обновлении
+        пользователя они не перезаписываются."""
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     """Модель подписок."""
@@ -77,6 +99,12 @@ class Subscription(models.Model):
                 name="unique_user_following"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["subscribed_to", "subscriber"],
+                name="subscription_author_idx"
+            ),
+        ]
         default_related_name = "subscriptions"
         verbose_name = "подписка"
         verbose_name_plural = "Подписки"
@@ -0,0 +1,138 @@
+import pytest
+from recipe.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                           ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Subscription, User
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(settings, tmp_path):
+    """Отдельный кэш и каталог файлов для каждого теста, превышение
+    бюджета запросов к базе приводит к ошибке."""
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            # Хранилище LocMemCache общее для одинаковых LOCATION.
+            "LOCATION": str(tmp_path),
+        }
+    }
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.METRICS_FLUSH_INTERVAL = 0
+    settings.QUERY_BUDGET_STRICT = True
+    return settings
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username="reader",
+        email="reader@example.com",
+        first_name="Читатель",
+        last_name="Тестовый",
+        password="password",
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username="author",
+        email="author@example.com",
+        first_name="Автор",
+        last_name="Тестовый",
+        password="password",
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+@pytest.fixture
+def author_client(author):
+    token, _ = Token.objects.get_or_create(user=author)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=name, slug=slug)
+        for name, slug in (("Завтрак", "breakfast"), ("Обед", "lunch"))
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ("абрикосы", "г"),
+            ("мука", "г"),
+            ("молоко", "мл"),
+            ("сахарная пудра", "г"),
+            ("яйца", "шт."),
+        )
+    ]
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    """Создание count рецептов автора со всеми тегами и ингредиентами."""
+
+    def make_recipes(count, author=author, prefix="Рецепт"):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"{prefix} {number}",
+                text="Описание рецепта.",
+                cooking_time=number + 1,
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredients=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients
+            )
+            recipes.append(recipe)
+        return recipes
+
+    return make_recipes
+
+
+@pytest.fixture
+def seeded(user, author, make_recipes, django_capture_on_commit_callbacks):
+    """Подписка читателя на автора, рецепты автора и чужие рецепты,
+    рецепты в избранном и списке покупок читателя."""
+    Subscription.objects.create(subscriber=user, subscribed_to=author)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipes = make_recipes(3)
+        make_recipes(2, author=create_user("other"), prefix="Другой")
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    return recipes
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        first_name="Имя",
+        last_name="Фамилия",
+        password="password",
+        **kwargs,
+    )
@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def captured_queries(client, url):
+    """SQL всех запросов к базе, выполненных при GET url."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+    assert response.status_code == 200, response.content
+    return [query["sql"] for query in context.captured_queries]
+
+
+def explain(sql, params=()):
+    """План запроса построчно: EXPLAIN в Postgres,
+    EXPLAIN QUERY PLAN в SQLite."""
+    prefix = (
+        "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    )
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # На маленьких тестовых таблицах последовательное чтение
+            # дешевле индекса, план строится как для больших таблиц.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"{prefix} {sql}", params or None)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def sorts(plan):
+    """Строки плана с сортировкой или устранением дубликатов."""
+    markers = (
+        ("USE TEMP B-TREE",) if connection.vendor == "sqlite"
+        else ("Sort", "Unique", "HashAggregate")
+    )
+    return [
+        line for line in plan
+        if any(marker in line for marker in markers)
+    ]
+
+
+def seq_scans(plan, tables):
+    """Строки плана Postgres с последовательным чтением таблиц tables."""
+    return [
+        line for line in plan
+        if "Seq Scan" in line
+        and any(f" on {table}" in line for table in tables)
+    ]
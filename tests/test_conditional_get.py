@@ -0,0 +1,93 @@
+import pytest
+from recipe.models import Ingredient, Tag
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["ETag"]
+    return response["ETag"]
+
+
+def revalidate(client, url, tag):
+    return client.get(url, HTTP_IF_NONE_MATCH=tag)
+
+
+@pytest.mark.parametrize("url", (
+    "/api/tags/", "/api/ingredients/", "/api/ingredients/?name=мо",
+))
+def test_reference_lists_return_304(client, tags, ingredients, url):
+    tag = etag(client, url)
+    response = revalidate(client, url, tag)
+    assert response.status_code == 304
+    assert response["ETag"] == tag
+    assert "max-age" in response["Cache-Control"]
+    assert revalidate(client, url, '"stale"').status_code == 200
+
+
+def test_tag_change_changes_etag(
+    client, tags, django_capture_on_commit_callbacks
+):
+    url = f"/api/tags/{tags[0].id}/"
+    tag = etag(client, url)
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name="Ужин", slug="dinner")
+    assert revalidate(client, url, tag).status_code == 200
+    assert etag(client, url) != tag
+
+
+def test_ingredient_change_changes_etag(
+    client, ingredients, django_capture_on_commit_callbacks
+):
+    url = "/api/ingredients/"
+    tag = etag(client, url)
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+    response = revalidate(client, url, tag)
+    assert response.status_code == 200
+    assert "соль" in {item["name"] for item in response.json()}
+
+
+def test_recipe_detail_etag(
+    client, author_client, make_recipes, ingredients, tags,
+    django_capture_on_commit_callbacks,
+):
+    recipe = make_recipes(1)[0]
+    url = f"/api/recipes/{recipe.id}/"
+    response = client.get(url)
+    tag = response["ETag"]
+    assert response["Last-Modified"]
+    assert revalidate(client, url, tag).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(url, {
+            "name": "Новое название",
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "tags": [item.id for item in tags],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 2}
+                for ingredient in ingredients
+            ],
+        }, format="json")
+    assert response.status_code == 200, response.content
+    response = revalidate(client, url, tag)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Новое название"
+    assert response["ETag"] != tag
+
+
+def test_author_change_changes_recipe_etag(client, make_recipes, author):
+    url = f"/api/recipes/{make_recipes(1)[0].id}/"
+    tag = etag(client, url)
+    User.objects.filter(pk=author.pk).update(first_name="Другое")
+    assert revalidate(client, url, tag).status_code == 200
+
+
+def test_authenticated_recipe_detail_has_no_etag(user_client, make_recipes):
+    """Ответ зависит от пользователя: условная обработка отключена."""
+    response = user_client.get(f"/api/recipes/{make_recipes(1)[0].id}/")
+    assert response.status_code == 200
+    assert not response.has_header("ETag")
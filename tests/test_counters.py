@@ -0,0 +1,86 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from recipe.models import Recipe
+from users.models import Subscription, User
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = "/api/recipes/"
+
+
+def counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.carts_count
+
+
+@pytest.mark.parametrize("action, index", (
+    ("favorite", 0), ("shopping_cart", 1),
+))
+def test_favorite_and_cart_counters(user_client, make_recipes, action, index):
+    recipe = make_recipes(1)[0]
+    url = f"{RECIPES_URL}{recipe.id}/{action}/"
+    assert user_client.post(url).status_code == 201
+    assert counters(recipe)[index] == 1
+    assert counters(recipe)[1 - index] == 0
+    assert user_client.post(url).status_code == 400
+    assert counters(recipe)[index] == 1
+    assert user_client.delete(url).status_code == 204
+    assert counters(recipe) == (0, 0)
+    assert user_client.delete(url).status_code == 400
+    assert counters(recipe) == (0, 0)
+
+
+def test_recipe_and_subscriber_counters(user, author, make_recipes):
+    recipes = make_recipes(2)
+    author.refresh_from_db()
+    assert author.recipes_count == 2
+    recipes[0].delete()
+    author.refresh_from_db()
+    assert author.recipes_count == 1
+    subscription = Subscription.objects.create(
+        subscriber=user, subscribed_to=author
+    )
+    author.refresh_from_db()
+    assert author.subscribers_count == 1
+    subscription.delete()
+    author.refresh_from_db()
+    assert author.subscribers_count == 0
+
+
+def test_recipe_update_keeps_counters(user_client, make_recipes):
+    recipe = make_recipes(1)[0]
+    user_client.post(f"{RECIPES_URL}{recipe.id}/favorite/")
+    stale = Recipe.objects.get(pk=recipe.pk)
+    user_client.post(f"{RECIPES_URL}{recipe.id}/shopping_cart/")
+    stale.name = "Новое название"
+    stale.save()
+    assert counters(recipe) == (1, 1)
+
+
+def recount(**options):
+    output = io.StringIO()
+    call_command("recount", stdout=output, **options)
+    return output.getvalue()
+
+
+def test_recount_repairs_drifted_counters(user, user_client, make_recipes):
+    recipe = make_recipes(1)[0]
+    user_client.post(f"{RECIPES_URL}{recipe.id}/favorite/")
+    Subscription.objects.create(subscriber=user, subscribed_to=recipe.author)
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=5, carts_count=3
+    )
+    User.objects.filter(pk=recipe.author_id).update(
+        recipes_count=0, subscribers_count=7
+    )
+    output = recount(dry_run=True)
+    assert "Всего расхождений: 4" in output
+    assert counters(recipe) == (5, 3)
+    output = recount()
+    assert "Всего расхождений: 4" in output
+    assert counters(recipe) == (1, 0)
+    author = User.objects.get(pk=recipe.author_id)
+    assert (author.recipes_count, author.subscribers_count) == (1, 1)
+    assert "Всего расхождений: 0" in recount()
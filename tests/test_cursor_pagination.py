@@ -0,0 +1,58 @@
+import base64
+
+import pytest
+from django.utils import timezone
+from recipe.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = "/api/recipes/"
+
+
+def traverse(client, url):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"next", "results"}
+        ids.extend(recipe["id"] for recipe in data["results"])
+        url = data["next"]
+    return ids
+
+
+@pytest.mark.parametrize("limit", (1, 2, 3, 7))
+def test_traversal_across_equal_timestamps(user_client, make_recipes, limit):
+    """Рецепты с одинаковым created_at различаются по id: каждый
+    выводится ровно один раз."""
+    recipes = make_recipes(7)
+    created_at = timezone.now()
+    Recipe.objects.filter(
+        pk__in=[recipe.id for recipe in recipes[1:6]]
+    ).update(created_at=created_at)
+    expected = list(
+        Recipe.objects.order_by("-created_at", "-id").values_list(
+            "id", flat=True
+        )
+    )
+    assert traverse(user_client, f"{RECIPES_URL}?cursor=&limit={limit}") == (
+        expected
+    )
+
+
+def encode(value):
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", (
+    "not-base64!",
+    encode("без разделителя"),
+    encode("2024-01-01T00:00:00|abc"),
+    encode("не дата|1"),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+))
+def test_invalid_cursor_returns_404(client, make_recipes, cursor):
+    make_recipes(1)
+    response = client.get(RECIPES_URL, {"cursor": cursor})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Неверный курсор."
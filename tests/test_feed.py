@@ -0,0 +1,117 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from api.paginators import FeedPagination
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipe.models import FeedEntry, Recipe
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import Subscription
+
+from .conftest import create_user
+
+pytestmark = pytest.mark.django_db
+
+FEED_URL = "/api/recipes/feed/"
+
+
+@pytest.fixture
+def feed(
+    settings, user, author, make_recipes, django_capture_on_commit_callbacks
+):
+    """Лента из рецептов автора с записями в FeedEntry и популярного
+    автора, часть рецептов которого разложена до перехода порога."""
+    settings.FEED_PULL_THRESHOLD = 2
+    popular = create_user("popular")
+    Subscription.objects.create(subscriber=user, subscribed_to=author)
+    Subscription.objects.create(subscriber=user, subscribed_to=popular)
+    with django_capture_on_commit_callbacks(execute=True):
+        make_recipes(2, author=popular, prefix="Ранний")
+        make_recipes(3)
+    with django_capture_on_commit_callbacks(execute=True):
+        Subscription.objects.create(
+            subscriber=create_user("fan"), subscribed_to=popular
+        )
+        make_recipes(2, author=popular, prefix="Поздний")
+        make_recipes(1, author=create_user("stranger"), prefix="Чужой")
+    return list(
+        Recipe.objects.filter(
+            author__in=(author, popular)
+        ).values_list("id", flat=True)
+    )
+
+
+def read_feed(client, url):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids.extend(recipe["id"] for recipe in response.json()["results"])
+        url = response.json()["next"]
+    return ids
+
+
+def test_feed_merges_pushed_and_pulled_recipes(user_client, feed):
+    assert FeedEntry.objects.filter(recipe__author__username="popular")
+    assert read_feed(user_client, FEED_URL) == feed
+
+
+@pytest.mark.parametrize("limit", (1, 2, 3))
+def test_feed_cursor_pages(user_client, feed, limit):
+    assert read_feed(user_client, f"{FEED_URL}?limit={limit}") == feed
+
+
+def test_feed_filters(user_client, feed, tags):
+    Recipe.objects.get(pk=feed[0]).tags.clear()
+    Recipe.objects.get(pk=feed[-1]).tags.clear()
+    assert read_feed(
+        user_client, f"{FEED_URL}?limit=2&tags={tags[0].slug}"
+    ) == feed[1:-1]
+
+
+def test_feed_reads_feed_entries(user_client, feed):
+    with CaptureQueriesContext(connection) as context:
+        user_client.get(f"{FEED_URL}?limit=3")
+    entries_table = FeedEntry._meta.db_table
+    queries = [
+        query["sql"] for query in context.captured_queries
+        if f'FROM "{entries_table}"' in query["sql"]
+    ]
+    assert queries
+    assert all("ORDER BY" in sql and "LIMIT 4" in sql for sql in queries)
+    assert not any(
+        entries_table in query["sql"] and "EXISTS" in query["sql"]
+        for query in context.captured_queries
+    )
+
+
+def feed_request(user, query=""):
+    request = Request(APIRequestFactory().get(f"{FEED_URL}?{query}"))
+    request.user = user
+    return request
+
+
+def test_feed_has_no_count(user_client, feed, monkeypatch):
+    """Лента не считает рецепты: ни COUNT(*), ни оценка Postgres."""
+    from api import paginators
+
+    def fail(*args, **kwargs):
+        raise AssertionError("количество ленты не вычисляется")
+
+    monkeypatch.setattr(paginators, "estimate_count", fail)
+    monkeypatch.setattr(paginators.CachedCountPagination, "get_count", fail)
+    response = user_client.get(FEED_URL)
+    assert set(response.json()) == {"next", "results"}
+
+
+def test_missing_recipes_keep_the_cursor(user, feed):
+    """Если рецептов страницы уже нет, ссылка на следующую страницу
+    строится по позиции в ленте."""
+    pagination = FeedPagination()
+    request = feed_request(user, "limit=2")
+    assert pagination.paginate_queryset(Recipe.objects.none(), request) == []
+    assert pagination.has_next
+    link = pagination.get_next_cursor_link()
+    cursor = parse_qs(urlsplit(link).query)["cursor"][0]
+    assert pagination.decode_cursor(cursor)[1] == feed[1]
@@ -0,0 +1,164 @@
+import base64
+import io
+import struct
+import time
+import zlib
+
+import pytest
+from api import images
+from api.images import ImageProcessingUnavailable, decode_base64_image
+from django.core.files.base import ContentFile
+from PIL import Image
+from recipe import models
+from recipe.thumbnails import THUMBNAIL_SIZES, thumbnail_name
+
+XPM = b"""/* XPM */
+static char *image[] = {
+"2 2 1 1",
+"a c #ff0000",
+"aa",
+"aa"};
+"""
+
+
+def encode(content, image_format):
+    encoded = base64.b64encode(content).decode()
+    return f"data:image/{image_format};base64,{encoded}"
+
+
+def png_content():
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def png():
+    return encode(png_content(), "png")
+
+
+def bomb(width=20000, height=20000):
+    """PNG, в заголовке которого указано огромное разрешение."""
+    buffer = io.BytesIO()
+    Image.new("1", (1, 1)).save(buffer, "PNG")
+    content = bytearray(buffer.getvalue())
+    header = b"IHDR" + struct.pack(">II", width, height) + content[24:29]
+    content[12:29] = header
+    content[29:33] = struct.pack(">I", zlib.crc32(header))
+    return encode(bytes(content), "png")
+
+
+def slow_process_image(data, max_size):
+    time.sleep(1)
+    return b"", "png"
+
+
+@pytest.fixture
+def pool(settings):
+    """Пул из одного процесса на одну задачу с коротким таймаутом."""
+    settings.IMAGE_WORKERS = 1
+    settings.IMAGE_MAX_CONCURRENCY = 1
+    settings.IMAGE_TIMEOUT = 0.2
+    images._executor, images._slots = None, None
+    yield
+    images._executor.shutdown(wait=True)
+    images._executor, images._slots = None, None
+
+
+@pytest.mark.parametrize("workers", (0, 1))
+def test_supported_image(settings, workers):
+    settings.IMAGE_WORKERS = workers
+    content, extension = decode_base64_image(png())
+    assert extension == "png"
+    assert Image.open(io.BytesIO(content)).size == (4, 4)
+
+
+def test_read_only_format_is_rejected(settings):
+    """XPM Pillow только читает: ошибка валидации вместо KeyError."""
+    settings.IMAGE_WORKERS = 0
+    assert Image.open(io.BytesIO(XPM)).format == "XPM"
+    with pytest.raises(ValueError, match="Допустимые форматы"):
+        decode_base64_image(encode(XPM, "xpm"))
+
+
+def test_timed_out_job_keeps_its_slot(pool, monkeypatch):
+    """После таймаута место освобождается только по завершении задачи."""
+    decode_base64_image(png())
+    time.sleep(0.1)
+    monkeypatch.setattr(images, "process_image", slow_process_image)
+    with pytest.raises(ImageProcessingUnavailable, match="время"):
+        decode_base64_image(png())
+    with pytest.raises(ImageProcessingUnavailable, match="занят"):
+        decode_base64_image(png())
+    time.sleep(1.5)
+    monkeypatch.undo()
+    content, extension = decode_base64_image(png())
+    assert extension == "png"
+
+
+@pytest.mark.parametrize("size", ((20000, 20000), (10000, 10000)))
+@pytest.mark.parametrize("workers", (0, 1))
+def test_decompression_bomb_is_rejected(settings, workers, size):
+    settings.IMAGE_WORKERS = workers
+    with pytest.raises(ValueError, match="разрешение"):
+        decode_base64_image(bomb(*size))
+
+
+@pytest.mark.django_db
+def test_decompression_bomb_avatar(user_client):
+    response = user_client.put(
+        "/api/users/me/avatar/", {"avatar": bomb()}, format="json"
+    )
+    assert response.status_code == 400
+    assert "разрешение" in str(response.json())
+
+
+def thumbnails_exist(image):
+    return all(
+        image.storage.exists(thumbnail_name(image.name, size))
+        for size in THUMBNAIL_SIZES
+    )
+
+
+@pytest.fixture
+def recipe_with_image(make_recipes):
+    recipe = make_recipes(1)[0]
+    recipe.image.save("pancakes.png", ContentFile(png_content()), save=False)
+    return recipe
+
+
+@pytest.mark.django_db
+def test_thumbnails_are_rendered_in_pool(pool, recipe_with_image):
+    future = images.generate_thumbnails(recipe_with_image.image)
+    assert future is not None
+    future.result(timeout=5)
+    assert thumbnails_exist(recipe_with_image.image)
+
+
+@pytest.mark.django_db
+def test_busy_pool_renders_thumbnails_inline(
+    pool, recipe_with_image, monkeypatch
+):
+    decode_base64_image(png())
+    time.sleep(0.1)
+    monkeypatch.setattr(images, "process_image", slow_process_image)
+    with pytest.raises(ImageProcessingUnavailable):
+        decode_base64_image(png())
+    assert images.generate_thumbnails(recipe_with_image.image) is None
+    assert thumbnails_exist(recipe_with_image.image)
+
+
+@pytest.mark.django_db
+def test_recipe_save_defers_thumbnails(
+    make_recipes, monkeypatch, django_capture_on_commit_callbacks
+):
+    scheduled = []
+    monkeypatch.setattr(models, "generate_thumbnails", scheduled.append)
+    recipe = make_recipes(1)[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.image = ContentFile(png_content(), name="pancakes.png")
+        recipe.save()
+        assert scheduled == []
+    assert [image.name for image in scheduled] == [recipe.image.name]
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    assert len(scheduled) == 1
@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+from api import filters
+from api.filters import IngredientFilter
+from django.core.management import call_command
+from django.db import connection
+from recipe.models import Ingredient
+
+from .explain import explain
+
+pytestmark = pytest.mark.django_db
+
+
+def search(value):
+    return [
+        ingredient.name for ingredient in IngredientFilter(
+            data={"name": value}, queryset=Ingredient.objects.all()
+        ).qs
+    ]
+
+
+def test_prefix_matches_go_first(ingredients):
+    Ingredient.objects.create(name="сухое молоко", measurement_unit="г")
+    assert search("МОЛ") == ["молоко", "сухое молоко"]
+    assert search("а") == ["абрикосы", "мука", "сахарная пудра", "яйца"]
+
+
+def test_prefix_only_search_without_trigram_index(ingredients, monkeypatch):
+    """Без pg_trgm ищутся только совпадения по началу названия."""
+    monkeypatch.setattr(
+        filters, "substring_search_available", lambda connection: False
+    )
+    Ingredient.objects.create(name="сухое молоко", measurement_unit="г")
+    assert search("МОЛ") == ["молоко"]
+    assert search("а") == ["абрикосы"]
+
+
+def test_ingredient_api_matches_database_search(client, ingredients):
+    """Справочник в памяти и поиск в базе дают одинаковый порядок."""
+    for value in ("мо", "а", "пудра", "нет такого"):
+        response = client.get("/api/ingredients/", {"name": value})
+        assert [item["name"] for item in response.json()] == search(value)
+
+
+def test_search_benchmark(ingredients):
+    """Справочник в памяти отвечает без запросов к базе."""
+    output = io.StringIO()
+    call_command("benchmark_ingredient_search", iterations=20, stdout=output)
+    results = json.loads(output.getvalue())["results"]
+    assert results["database"]["queries"] == 20
+    assert results["catalog"]["queries"] == 0
+
+
+@pytest.mark.postgres
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="индексы есть только в Postgres"
+)
+def test_search_uses_trigram_index(ingredients):
+    queryset = IngredientFilter(
+        data={"name": "мо"}, queryset=Ingredient.objects.all()
+    ).qs
+    plan = "\n".join(explain(*queryset.query.sql_with_params()))
+    assert "ingredient_name_trgm_idx" in plan
+
+
+@pytest.mark.postgres
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="индексы есть только в Postgres"
+)
+def test_prefix_search_uses_pattern_index(ingredients, monkeypatch):
+    monkeypatch.setattr(
+        filters, "substring_search_available", lambda connection: False
+    )
+    queryset = IngredientFilter(
+        data={"name": "мо"}, queryset=Ingredient.objects.all()
+    ).qs
+    plan = "\n".join(explain(*queryset.query.sql_with_params()))
+    assert "ingredient_name_prefix_idx" in plan
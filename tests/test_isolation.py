@@ -0,0 +1,18 @@
+import pytest
+from api.metrics import get_counter, increment
+from api.versions import RECIPE_LIST, get_version
+from django.core.cache import cache
+
+PROBE_KEY = "isolation:probe"
+
+
+@pytest.mark.parametrize("run", (1, 2))
+def test_cache_is_empty_in_each_test(run):
+    """Версии, счётчики и закэшированные значения не переходят из
+    одного теста в другой."""
+    assert cache.get(PROBE_KEY) is None
+    assert cache.get(f"version:{RECIPE_LIST}") is None
+    assert get_counter("isolation_probe_total") == 0
+    cache.set(PROBE_KEY, run)
+    get_version(RECIPE_LIST)
+    increment("isolation_probe_total")
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from api.versions import INGREDIENTS, RECIPE_LIST, get_version
+from django.core.management import call_command
+from recipe.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+def load(path):
+    call_command("load_ingredients", str(path), stdout=io.StringIO())
+
+
+def test_load_csv_and_json(tmp_path):
+    csv_path = tmp_path / "ingredients.csv"
+    csv_path.write_text("мука,г\nмолоко,мл\nмука,г\n", encoding="utf-8")
+    load(csv_path)
+    json_path = tmp_path / "ingredients.json"
+    json_path.write_text(
+        '[{"name": "мука", "measurement_unit": "кг"},'
+        ' {"name": "яйца", "measurement_unit": "шт."}]',
+        encoding="utf-8",
+    )
+    load(json_path)
+    assert dict(
+        Ingredient.objects.values_list("name", "measurement_unit")
+    ) == {"мука": "кг", "молоко": "мл", "яйца": "шт."}
+
+
+def test_load_invalidates_recipe_lists(
+    tmp_path, ingredients, django_capture_on_commit_callbacks
+):
+    """Изменённая единица измерения сбрасывает кэш списков рецептов."""
+    path = tmp_path / "ingredients.csv"
+    path.write_text("мука,кг\n", encoding="utf-8")
+    versions = get_version(INGREDIENTS), get_version(RECIPE_LIST)
+    with django_capture_on_commit_callbacks(execute=True):
+        load(path)
+    assert get_version(INGREDIENTS) != versions[0]
+    assert get_version(RECIPE_LIST) != versions[1]
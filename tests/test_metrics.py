@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+from api import metrics
+from api.checks import metrics_cache_check
+from django.core.cache import cache
+
+
+@pytest.fixture
+def new_process(monkeypatch):
+    """Сброс состояния процесса: как если бы писал другой воркер."""
+
+    def reset():
+        monkeypatch.setattr(metrics, "_registered", set())
+
+    return reset
+
+
+def test_workers_register_names_in_own_slots(new_process):
+    metrics._store("first_total", 1)
+    new_process()
+    metrics._store("second_total", 2)
+    new_process()
+    metrics._store("first_total", 3)
+    assert cache.get(metrics._slot_key(0)) == "first_total"
+    assert cache.get(metrics._slot_key(1)) == "second_total"
+    assert cache.get(metrics._slot_key(2)) is None
+    assert metrics.get_counters() == {"first_total": 4, "second_total": 2}
+
+
+def test_concurrent_increments_are_kept(new_process):
+    threads_count, increments = 8, 50
+    barrier = threading.Barrier(threads_count)
+
+    def work(number):
+        barrier.wait()
+        for _ in range(increments):
+            metrics._store(f"thread_{number}_total", 1)
+            metrics._store("shared_total", 1)
+
+    threads = [
+        threading.Thread(target=work, args=(number,))
+        for number in range(threads_count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters = metrics.get_counters()
+    assert counters.pop("shared_total") == threads_count * increments
+    assert counters == {
+        f"thread_{number}_total": increments
+        for number in range(threads_count)
+    }
+
+
+def test_registry_is_read_in_batches(monkeypatch):
+    monkeypatch.setattr(metrics, "NAMES_BATCH_SIZE", 2)
+    for number in range(5):
+        metrics._store(f"batch_{number}_total", number)
+    assert metrics.get_counters() == {
+        f"batch_{number}_total": number for number in range(5)
+    }
+
+
+def test_name_is_registered_again_after_cache_clear():
+    metrics._store("cleared_total", 1)
+    cache.clear()
+    metrics._store("cleared_total", 2)
+    assert metrics.get_counters() == {"cleared_total": 2}
+
+
+def test_file_based_cache_is_reported(settings, tmp_path):
+    assert metrics_cache_check(None) == []
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+    assert [error.id for error in metrics_cache_check(None)] == ["api.W001"]
@@ -0,0 +1,129 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .conftest import create_user
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = "/api/recipes/"
+
+
+@pytest.fixture
+def other_client():
+    token = Token.objects.create(user=create_user("other"))
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def count(client, query=""):
+    return client.get(f"{RECIPES_URL}?{query}").json()["count"]
+
+
+def count_key(client, query=""):
+    """Ключ кэша количества, вычисленный пагинацией для запроса."""
+    response = client.get(f"{RECIPES_URL}?{query}")
+    return response.renderer_context["view"].paginator.count_key
+
+
+@pytest.fixture
+def count_key_capture(monkeypatch):
+    from api import paginators
+
+    get_count_key = paginators.CachedCountPagination.get_count_key
+
+    def capture(self, *args, **kwargs):
+        self.count_key = get_count_key(self, *args, **kwargs)
+        return self.count_key
+
+    monkeypatch.setattr(
+        paginators.CachedCountPagination, "get_count_key", capture
+    )
+
+
+def test_favorites_invalidate_only_own_counts(
+    user_client, other_client, make_recipes, count_key_capture,
+    django_capture_on_commit_callbacks,
+):
+    recipe, _ = make_recipes(2)
+    global_key = count_key(user_client)
+    own_key = count_key(user_client, "is_favorited=1")
+    other_key = count_key(other_client, "is_favorited=1")
+    assert count(user_client, "is_favorited=1") == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f"{RECIPES_URL}{recipe.id}/favorite/")
+    assert count(user_client, "is_favorited=1") == 1
+    assert count_key(user_client, "is_favorited=1") != own_key
+    assert count_key(other_client, "is_favorited=1") == other_key
+    assert count_key(user_client) == global_key
+    assert count(other_client, "is_favorited=1") == 0
+
+
+def test_recipe_creation_invalidates_user_counts(
+    user_client, make_recipes, count_key_capture,
+    django_capture_on_commit_callbacks,
+):
+    make_recipes(1)
+    own_key = count_key(user_client, "is_favorited=1")
+    global_key = count_key(user_client)
+    with django_capture_on_commit_callbacks(execute=True):
+        make_recipes(1, prefix="Новый")
+    assert count_key(user_client) != global_key
+    assert count_key(user_client, "is_favorited=1") != own_key
+    assert count(user_client) == 2
+
+
+def read_pages(client, url):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(response.json())
+        url = response.json()["next"]
+    return pages
+
+
+@pytest.fixture
+def low_estimate(settings, monkeypatch):
+    """Оценка reltuples меньше реального числа рецептов."""
+    from api import paginators
+
+    settings.APPROXIMATE_COUNT_THRESHOLD = 5
+    monkeypatch.setattr(paginators, "estimate_count", lambda model: 7)
+
+
+def test_low_estimate_does_not_truncate_pages(
+    user_client, make_recipes, low_estimate
+):
+    recipes = make_recipes(10)
+    pages = read_pages(user_client, f"{RECIPES_URL}?limit=4")
+    assert [len(page["results"]) for page in pages] == [4, 4, 2]
+    assert [
+        recipe["id"] for page in pages for recipe in page["results"]
+    ] == [recipe.id for recipe in reversed(recipes)]
+    assert pages[0]["count"] == 7
+    assert pages[1]["count"] == 9
+    assert pages[-1]["count"] == 10
+    assert pages[-1]["previous"].endswith("?limit=4&page=2")
+    response = user_client.get(f"{RECIPES_URL}?limit=4&page=4")
+    assert response.status_code == 404
+
+
+def test_stale_cached_count_does_not_truncate_pages(
+    user_client, make_recipes, count_key_capture
+):
+    make_recipes(6)
+    key = count_key(user_client, "limit=2")
+    cache.set(key, 2)
+    pages = read_pages(user_client, f"{RECIPES_URL}?limit=2")
+    assert [len(page["results"]) for page in pages] == [2, 2, 2]
+    assert pages[-1]["count"] == 6
+
+
+@pytest.mark.parametrize("page", ("0", "-1", "last", "abc"))
+def test_invalid_page(user_client, make_recipes, page):
+    make_recipes(1)
+    response = user_client.get(f"{RECIPES_URL}?page={page}")
+    assert response.status_code == 404
@@ -0,0 +1,91 @@
+import importlib
+
+import pytest
+from api.middleware import QueryBudgetExceeded
+from api.metrics import get_counter
+from api.views import TagViewSet
+
+from backend import settings as backend_settings
+
+pytestmark = pytest.mark.django_db
+
+
+def get(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b"".join(response.streaming_content)
+    assert response.status_code == 200, response.content
+    return response
+
+
+@pytest.mark.parametrize("representation_cache", (True, False))
+@pytest.mark.parametrize("url", (
+    "/api/tags/",
+    "/api/tags/{tag}/",
+    "/api/ingredients/",
+    "/api/ingredients/?name=мо",
+    "/api/ingredients/{ingredient}/",
+    "/api/recipes/",
+    "/api/recipes/?tags=breakfast&is_favorited=1",
+    "/api/recipes/?cursor=",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/{recipe}/get-link/",
+    "/api/users/",
+    "/api/users/{author}/",
+))
+def test_budgets_hold_for_anonymous_and_token_users(
+    settings, client, user_client, seeded, tags, ingredients, author,
+    url, representation_cache,
+):
+    """Запрос токена не входит в бюджет: ответы одинаковы для анонима
+    и пользователя с токеном в строгом режиме."""
+    settings.RECIPE_REPRESENTATION_CACHE = representation_cache
+    url = url.format(
+        tag=tags[0].id,
+        ingredient=ingredients[0].id,
+        recipe=seeded[0].id,
+        author=author.id,
+    )
+    get(client, url)
+    get(user_client, url)
+
+
+@pytest.mark.parametrize("url", (
+    "/api/recipes/feed/",
+    "/api/recipes/feed/?tags=breakfast",
+    "/api/recipes/download_shopping_cart/",
+    "/api/users/me/",
+    "/api/users/subscriptions/",
+))
+def test_budgets_hold_for_user_actions(user_client, seeded, url):
+    get(user_client, url)
+
+
+def test_strict_mode_raises(settings, user_client, tags, monkeypatch):
+    monkeypatch.setattr(TagViewSet, "query_budgets", {"list": 0})
+    with pytest.raises(QueryBudgetExceeded):
+        user_client.get("/api/tags/")
+
+
+def test_budget_overrun_is_logged_by_default(
+    settings, user_client, tags, monkeypatch, caplog
+):
+    settings.QUERY_BUDGET_STRICT = False
+    monkeypatch.setattr(TagViewSet, "query_budgets", {"list": 0})
+    label = "TagViewSet.list"
+    exceeded = get_counter(f"api_query_budget_exceeded_total:{label}")
+    response = get(user_client, "/api/tags/")
+    assert f"{label}: 1 запросов к базе при бюджете 0" in caplog.text
+    assert get_counter(
+        f"api_query_budget_exceeded_total:{label}"
+    ) == exceeded + 1
+    assert 'desc="2 queries"' in response["Server-Timing"]
+
+
+def test_strict_mode_is_opt_in(monkeypatch):
+    """Строгий режим не включается вместе с DEBUG."""
+    monkeypatch.delenv("QUERY_BUDGET_STRICT", raising=False)
+    monkeypatch.setenv("DEBUG", "True")
+    assert importlib.reload(backend_settings).QUERY_BUDGET_STRICT is False
+    monkeypatch.setenv("QUERY_BUDGET_STRICT", "true")
+    assert importlib.reload(backend_settings).QUERY_BUDGET_STRICT is True
@@ -0,0 +1,53 @@
+import pytest
+from django.db import connection
+from recipe.models import (Favorite, FeedEntry, Recipe, RecipeIngredient,
+                           ShoppingCart, ShoppingListItem)
+from users.models import Subscription
+
+from .explain import captured_queries, explain, seq_scans
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.postgres,
+    pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="планы с enable_seqscan = off строит только Postgres",
+    ),
+]
+
+# Таблицы, которые растут вместе с числом пользователей и рецептов;
+# справочники тегов и ингредиентов небольшие.
+LARGE_TABLES = tuple(
+    model._meta.db_table for model in (
+        Recipe,
+        Recipe.tags.through,
+        RecipeIngredient,
+        Favorite,
+        ShoppingCart,
+        ShoppingListItem,
+        Subscription,
+        FeedEntry,
+    )
+)
+
+
+@pytest.mark.parametrize("url", (
+    "/api/recipes/",
+    "/api/recipes/?cursor=",
+    "/api/recipes/?tags=breakfast&tags=lunch",
+    "/api/recipes/?author={author}",
+    "/api/recipes/?is_favorited=1",
+    "/api/recipes/?is_in_shopping_cart=1",
+    "/api/recipes/feed/",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/download_shopping_cart/",
+    "/api/users/subscriptions/",
+))
+def test_endpoint_has_no_seq_scans(user_client, author, seeded, url):
+    """Запросы эндпоинта читают большие таблицы только по индексам."""
+    url = url.format(author=author.id, recipe=seeded[0].id)
+    for sql in captured_queries(user_client, url):
+        if not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        plan = explain(sql)
+        assert not seq_scans(plan, LARGE_TABLES), (sql, plan)
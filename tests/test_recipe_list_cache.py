@@ -0,0 +1,48 @@
+import pytest
+from api.versions import RECIPE_LIST, get_version
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe_list_version(django_capture_on_commit_callbacks):
+    """Версия списков рецептов после выполнения действия."""
+
+    def recipe_list_version(action):
+        with django_capture_on_commit_callbacks(execute=True):
+            action()
+        return get_version(RECIPE_LIST)
+
+    return recipe_list_version
+
+
+def test_login_keeps_recipe_lists(client, author, recipe_list_version):
+    version = get_version(RECIPE_LIST)
+
+    def login():
+        response = client.post(
+            "/api/auth/token/login/",
+            {"email": author.email, "password": "password"},
+        )
+        assert response.status_code == 200
+
+    assert recipe_list_version(login) == version
+    author.refresh_from_db()
+    assert author.last_login is not None
+
+
+@pytest.mark.parametrize("update_fields", (None, ["first_name"]))
+def test_author_change_invalidates_recipe_lists(
+    author, recipe_list_version, update_fields
+):
+    version = get_version(RECIPE_LIST)
+    author.first_name = "Новое имя"
+    assert recipe_list_version(
+        lambda: author.save(update_fields=update_fields)
+    ) != version
+
+
+def test_anonymous_list_cache(client, make_recipes, author):
+    make_recipes(2)
+    assert client.get("/api/recipes/")["X-Cache"] == "MISS"
+    assert client.get("/api/recipes/")["X-Cache"] == "HIT"
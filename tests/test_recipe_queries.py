@@ -0,0 +1,49 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = "/api/recipes/"
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()
+
+
+@pytest.mark.parametrize("authenticated", (False, True))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    settings, client, user_client, make_recipes, authenticated
+):
+    """Количество запросов списка рецептов одинаково при любом размере
+    страницы: ингредиенты, теги и авторы загружаются пачкой."""
+    settings.RECIPE_REPRESENTATION_CACHE = False
+    make_recipes(12)
+    api_client = user_client if authenticated else client
+    small_count, small_page = count_queries(
+        api_client, f"{RECIPES_URL}?limit=2&tags=lunch"
+    )
+    large_count, large_page = count_queries(
+        api_client, f"{RECIPES_URL}?limit=10&tags=lunch"
+    )
+    assert len(small_page["results"]) == 2
+    assert len(large_page["results"]) == 10
+    assert all(
+        len(recipe["ingredients"]) == 5 for recipe in large_page["results"]
+    )
+    assert small_count == large_count
+
+
+def test_recipe_list_query_count(
+    settings, user_client, make_recipes, django_assert_num_queries
+):
+    """Авторизация, COUNT(*), рецепты, теги и ингредиенты."""
+    settings.RECIPE_REPRESENTATION_CACHE = False
+    make_recipes(12)
+    with django_assert_num_queries(5):
+        user_client.get(f"{RECIPES_URL}?limit=10")
@@ -0,0 +1,34 @@
+import pytest
+from recipe.models import Favorite
+
+from .explain import captured_queries, explain, sorts
+
+pytestmark = pytest.mark.django_db
+
+
+def recipe_page_query(queries):
+    """Запрос страницы рецептов: SELECT из recipe_recipe с LIMIT."""
+    return next(
+        sql for sql in queries
+        if 'FROM "recipe_recipe"' in sql and "LIMIT" in sql
+        and "COUNT(" not in sql
+    )
+
+
+@pytest.mark.parametrize("url", (
+    "/api/recipes/",
+    "/api/recipes/?tags=breakfast&tags=lunch",
+    "/api/recipes/?is_favorited=1&tags=lunch",
+    "/api/recipes/?cursor=",
+))
+def test_recipe_list_has_no_sort_or_distinct(
+    user, user_client, make_recipes, url
+):
+    """Список рецептов читается по индексу (created_at, id) без
+    DISTINCT и сортировки строк рецептов."""
+    recipes = make_recipes(3)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    sql = recipe_page_query(captured_queries(user_client, url))
+    assert "DISTINCT" not in sql
+    plan = explain(sql)
+    assert not sorts(plan), plan
@@ -0,0 +1,44 @@
+import pytest
+from api import serializers
+from recipe.models import RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+def ingredient_amounts(client, recipe):
+    response = client.get(f"/api/recipes/{recipe.id}/")
+    return {
+        item["name"]: item["amount"] for item in response.json()["ingredients"]
+    }
+
+
+def test_ingredient_admin_edit_refreshes_cached_representation(
+    settings, user_client, make_recipes, ingredients
+):
+    settings.RECIPE_REPRESENTATION_CACHE = True
+    recipe, = make_recipes(1)
+    assert ingredient_amounts(user_client, recipe)["мука"] == 1
+    row = RecipeIngredient.objects.get(recipe=recipe, ingredients__name="мука")
+    row.amount = 250
+    row.save()
+    assert ingredient_amounts(user_client, recipe)["мука"] == 250
+    row.delete()
+    assert "мука" not in ingredient_amounts(user_client, recipe)
+
+
+def test_reference_versions_are_read_once_per_page(
+    settings, user_client, make_recipes, monkeypatch
+):
+    settings.RECIPE_REPRESENTATION_CACHE = True
+    make_recipes(10)
+    calls = []
+    get_version = serializers.get_version
+
+    def counting_get_version(name):
+        calls.append(name)
+        return get_version(name)
+
+    monkeypatch.setattr(serializers, "get_version", counting_get_version)
+    response = user_client.get("/api/recipes/?limit=10")
+    assert len(response.json()["results"]) == 10
+    assert sorted(calls) == sorted([serializers.TAGS, serializers.INGREDIENTS])
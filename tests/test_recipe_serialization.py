@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+from api.management.commands.benchmark_serializers import (SERIALIZERS,
+                                                           make_request,
+                                                           render)
+from django.core.management import call_command
+from recipe.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(user, author, make_recipes):
+    """Рецепты с картинками и без, автор с аватаром, часть рецептов
+    в избранном и списке покупок читателя."""
+    recipes = make_recipes(4)
+    make_recipes(2, author=user, prefix="Свой")
+    Recipe.objects.filter(pk__in=[recipes[0].id, recipes[2].id]).update(
+        image="recipes/images/pancakes.png"
+    )
+    User.objects.filter(pk=author.pk).update(avatar="users/author.png")
+    Subscription.objects.create(subscriber=user, subscribed_to=author)
+    Favorite.objects.create(user=user, recipe=recipes[1])
+    ShoppingCart.objects.create(user=user, recipe=recipes[2])
+    return list(Recipe.objects.select_related("author"))
+
+
+@pytest.mark.parametrize("name", SERIALIZERS)
+@pytest.mark.parametrize("authenticated", (False, True))
+def test_output_is_byte_identical(settings, user, recipes, name, authenticated):
+    """Представления строятся без полей DRF, а ответ не меняется."""
+    settings.RECIPE_REPRESENTATION_CACHE = False
+    legacy, current = SERIALIZERS[name]
+    request = make_request(user if authenticated else None)
+    expected = render(legacy, recipes, request)
+    assert render(current, recipes, request) == expected
+    data = json.loads(expected)
+    assert any(recipe["image_thumbnail"] for recipe in data)
+    if name == "recipe_read":
+        assert {recipe["is_favorited"] for recipe in data} == {
+            False, authenticated
+        }
+        assert any(recipe["author"]["avatar"] for recipe in data)
+
+
+def test_serializers_benchmark(recipes):
+    output = io.StringIO()
+    call_command(
+        "benchmark_serializers", iterations=2, user=recipes[0].author_id,
+        stdout=output,
+    )
+    results = json.loads(output.getvalue())["results"]
+    assert set(results) == set(SERIALIZERS)
+    assert all(result["identical"] for result in results.values())
@@ -0,0 +1,74 @@
+import csv
+import io
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+DOWNLOAD_URL = "/api/recipes/download_shopping_cart/"
+
+
+@pytest.fixture
+def cart(user_client, make_recipes):
+    recipes = make_recipes(3)
+    for recipe in recipes:
+        response = user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        assert response.status_code == 201
+    return recipes
+
+
+def download(client, file_format):
+    response = client.get(DOWNLOAD_URL, {"format": file_format})
+    assert response.status_code == 200
+    return response, b"".join(response.streaming_content)
+
+
+def test_download_txt(user_client, cart):
+    response, content = download(user_client, "txt")
+    assert response["Content-Type"] == "text/plain"
+    assert content.decode().splitlines() == [
+        "абрикосы (г): 6",
+        "молоко (мл): 6",
+        "мука (г): 6",
+        "сахарная пудра (г): 6",
+        "яйца (шт.): 6",
+    ]
+
+
+def test_download_csv(user_client, cart):
+    response, content = download(user_client, "csv")
+    rows = list(csv.reader(io.StringIO(content.decode())))
+    assert rows[0] == ["Ингредиент", "Единица измерения", "Количество"]
+    assert rows[1] == ["абрикосы", "г", "6"]
+    assert len(rows) == 6
+
+
+def test_download_pdf(user_client, cart):
+    response, content = download(user_client, "pdf")
+    assert response["Content-Type"] == "application/pdf"
+    assert response["Content-Disposition"] == (
+        "attachment; filename=shopping_cart.pdf"
+    )
+    assert content.startswith(b"%PDF-")
+    assert content.rstrip().endswith(b"%%EOF")
+    assert b"DejaVuSans" in content
+
+
+def test_download_pdf_splits_pages():
+    from api.shopping_cart import render_pdf
+
+    ingredients = (
+        {
+            "ingredient__name": f"ингредиент {number}",
+            "ingredient__measurement_unit": "г",
+            "total_amount": number,
+        }
+        for number in range(200)
+    )
+    content = b"".join(render_pdf(ingredients))
+    assert b"/Count 5" in content
+
+
+def test_download_unknown_format(user_client, cart):
+    response = user_client.get(DOWNLOAD_URL, {"format": "docx"})
+    assert response.status_code == 400
@@ -0,0 +1,103 @@
+import pytest
+from recipe.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+pytestmark = pytest.mark.django_db
+
+
+def stored_totals():
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount
+        in ShoppingListItem.objects.values_list(
+            "user_id", "ingredient_id", "total_amount"
+        )
+    }
+
+
+def assert_consistent():
+    assert stored_totals() == ShoppingListItem.objects.expected_totals()
+
+
+@pytest.fixture
+def cart(user, make_recipes):
+    recipes = make_recipes(2)
+    for recipe in recipes:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    return recipes
+
+
+def test_cart_api_maintains_aggregate(user, user_client, make_recipes):
+    first, second = make_recipes(2)
+    for recipe in (first, second):
+        user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+    assert set(stored_totals().values()) == {3}
+    assert_consistent()
+    user_client.delete(f"/api/recipes/{first.id}/shopping_cart/")
+    assert set(stored_totals().values()) == {2}
+    assert_consistent()
+    user_client.delete(f"/api/recipes/{second.id}/shopping_cart/")
+    assert stored_totals() == {}
+
+
+def test_recipe_ingredient_admin_edits(user, cart, ingredients):
+    row = RecipeIngredient.objects.get(
+        recipe=cart[0], ingredients=ingredients[0]
+    )
+    row.amount = 100
+    row.save()
+    assert stored_totals()[(user.id, ingredients[0].id)] == 102
+    row.ingredients = ingredients[1]
+    RecipeIngredient.objects.filter(
+        recipe=cart[0], ingredients=ingredients[1]
+    ).delete()
+    row.save()
+    assert_consistent()
+    row.delete()
+    assert_consistent()
+    RecipeIngredient.objects.create(
+        recipe=cart[0], ingredients=ingredients[0], amount=7
+    )
+    assert stored_totals()[(user.id, ingredients[0].id)] == 9
+    assert_consistent()
+
+
+def test_recipe_update_via_api(user, author_client, cart, ingredients):
+    response = author_client.patch(
+        f"/api/recipes/{cart[0].id}/",
+        {
+            "tags": [tag.id for tag in cart[0].tags.all()],
+            "ingredients": [
+                {"id": ingredients[0].id, "amount": 10},
+                {"id": ingredients[1].id, "amount": 1},
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == 200
+    assert stored_totals()[(user.id, ingredients[0].id)] == 12
+    assert_consistent()
+
+
+@pytest.mark.parametrize("delete", ("recipe", "user", "cart"))
+def test_cascade_deletes(user, author_client, cart, delete):
+    if delete == "recipe":
+        response = author_client.delete(f"/api/recipes/{cart[0].id}/")
+        assert response.status_code == 204
+    elif delete == "cart":
+        ShoppingCart.objects.filter(user=user).delete()
+    else:
+        user.delete()
+    assert_consistent()
+
+
+def test_apply_deltas_upserts_existing_rows(user, ingredients):
+    ShoppingListItem.objects.create(
+        user=user, ingredient=ingredients[0], total_amount=5
+    )
+    ShoppingListItem.objects.apply_deltas(
+        [user.id], {ingredients[0].id: 3, ingredients[1].id: 4}
+    )
+    ShoppingListItem.objects.apply_deltas(
+        [user.id], {ingredients[0].id: -8, ingredients[1].id: 1}
+    )
+    assert stored_totals() == {(user.id, ingredients[1].id): 5}
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from users.models import Subscription
+
+from .conftest import create_user
+
+pytestmark = pytest.mark.django_db
+
+SUBSCRIPTIONS_URL = "/api/users/subscriptions/"
+
+
+@pytest.fixture
+def follow(user, make_recipes):
+    """Подписка читателя на нового автора с count рецептами."""
+    authors = []
+
+    def follow(count):
+        author = create_user(f"author{len(authors)}")
+        authors.append(author)
+        recipes = make_recipes(count, author=author, prefix=author.username)
+        Subscription.objects.create(subscriber=user, subscribed_to=author)
+        return author, recipes
+
+    return follow
+
+
+def subscriptions(client, query=""):
+    response = client.get(f"{SUBSCRIPTIONS_URL}?{query}")
+    assert response.status_code == 200
+    return {author["id"]: author for author in response.json()["results"]}
+
+
+def test_recipes_limit_keeps_newest_recipes(user_client, follow):
+    authors = [follow(count) for count in (5, 1, 0)]
+    data = subscriptions(user_client, "recipes_limit=2")
+    for author, recipes in authors:
+        expected = [recipe.id for recipe in reversed(recipes)][:2]
+        assert [
+            recipe["id"] for recipe in data[author.id]["recipes"]
+        ] == expected
+        assert data[author.id]["recipes_count"] == len(recipes)
+
+
+def test_zero_recipes_limit_returns_all_recipes(user_client, follow):
+    author, recipes = follow(4)
+    data = subscriptions(user_client, "recipes_limit=0")
+    assert len(data[author.id]["recipes"]) == len(recipes)
+
+
+def test_query_count_does_not_grow_with_authors(user_client, follow):
+    def count_queries():
+        with CaptureQueriesContext(connection) as context:
+            subscriptions(user_client, "recipes_limit=2")
+        return len(context.captured_queries)
+
+    for _ in range(2):
+        follow(3)
+    few = count_queries()
+    for _ in range(4):
+        follow(3)
+    assert count_queries() == few